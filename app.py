@@ -1,52 +1,96 @@
-from photo import scan_directories_api
+from photo import scan_directories_api, load_storage_config, DEFAULT_STORAGE_TYPE
+from photo import get_storage as create_storage
 from flask import Flask, request, jsonify
 import os
+import re
 from flask_cors import CORS
-from csv_storage import CSVStorage
-from sqlite_storage import SQLiteStorage
-from pathlib import Path
 import json
+import threading
+import zlib
+from email.utils import formatdate
+from werkzeug.http import quote_etag
 
 app = Flask(__name__)
 CORS(app)
 
-# Global storage instance - in a real app, you'd want to manage this better
+# Global storage instance, created once at startup (see get_storage)
 storage = None
+_storage_lock = threading.Lock()
 
-
-# Configuration file path
-CONFIG_FILE = "config.json"
+# Largest page size accepted by /duplicates
+MAX_PER_PAGE = 100
+# Number of groups read from storage at a time when exporting NDJSON
+NDJSON_BATCH_SIZE = 100
+# Valid ?after= cursors: a sha256 hex digest or a prefix of one
+CURSOR_PATTERN = re.compile(r'[0-9a-f]{0,64}')
 
 def get_storage():
-    """Get appropriate storage instance based on configuration file"""
+    """Get appropriate storage instance based on configuration"""
     global storage
     if storage is None:
-        storage_type = "csv"  # Default storage type
-        
-        # Try to load storage type from configuration file
-        try:
-            if Path(CONFIG_FILE).exists():
-                with open(CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
-                storage_type = config.get("storage_type", "csv")
-            else:
-                # If no config file exists, create a default one
-                config = {"storage_type": "csv"}
-                with open(CONFIG_FILE, 'w') as f:
-                    json.dump(config, f, indent=2)
-        except Exception as e:
-            # If there's an error reading the config, use default
-            print(f"Warning: Could not read config file, using default storage: {e}")
-            storage_type = "csv"
-        
-        # Initialize appropriate storage based on config
-        if storage_type == "sqlite":
-            storage = SQLiteStorage()
-        else:
-            storage = CSVStorage()
-            
+        # Double-checked locking so concurrent first requests share one instance
+        with _storage_lock:
+            if storage is None:
+                storage = _create_storage()
     return storage
 
+def _create_storage():
+    """Create the storage instance selected by STORAGE_TYPE or the configuration file"""
+    return create_storage(load_storage_config() or DEFAULT_STORAGE_TYPE)
+
+def _dumps(payload):
+    """Serialize JSON compactly, without jsonify's key sorting and pretty-printing"""
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+
+def _json_response(payload, status=200):
+    """Build a compact JSON response"""
+    return app.response_class(_dumps(payload), status=status, mimetype='application/json')
+
+def _stream_duplicates(groups, pagination):
+    """Yield the /duplicates response body one group at a time"""
+    yield '{"success":true,"data":['
+    for i, group in enumerate(groups):
+        yield (',' if i else '') + _dumps(group)
+    yield '],"pagination":' + _dumps(pagination) + '}'
+
+def _stream_ndjson(storage_instance, after=None):
+    """Yield every duplicate group after the cursor as one JSON line each
+    
+    Groups are read from storage in cursor-paginated batches, so memory stays
+    bounded by the batch size however many groups are exported.
+    """
+    while True:
+        groups = storage_instance.get_duplicate_groups(limit=NDJSON_BATCH_SIZE, after=after)
+        for group in groups:
+            yield _dumps(group) + '\n'
+        if len(groups) < NDJSON_BATCH_SIZE:
+            return
+        after = groups[-1][0]['sha256']
+
+def _add_cache_headers(response, etag, last_modified_ns):
+    """Mark a duplicates response as revalidatable against the storage's modification time"""
+    if etag is not None:
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = formatdate(last_modified_ns / 1e9, usegmt=True)
+        # Always revalidate, so a page fetched right after a scan is never stale
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _not_modified(opaque_tag, last_modified_ns):
+    """Check the request's If-None-Match / If-Modified-Since against the current duplicates
+    
+    If-None-Match takes precedence when both are sent, as HTTP requires.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(opaque_tag)
+    if request.if_modified_since is not None:
+        # HTTP dates have whole-second resolution
+        return last_modified_ns // 1_000_000_000 <= request.if_modified_since.timestamp()
+    return False
+
+# Initialize storage at startup so requests don't pay for reading the config
+get_storage()
+
 @app.route('/delete-file', methods=['POST'])
 def delete_file():
     data = request.json
@@ -72,49 +116,80 @@ def get_duplicates():
     """
     Get duplicate file groups from storage.
     Returns 20 groups per request with pagination support.
+    
+    Pages are addressed either by number (?page=N) or by cursor
+    (?after=<sha256>&limit=N), where the cursor is the next_cursor of the
+    previous response. Cursor pagination doesn't skip earlier groups.
+    
+    With ?format=ndjson, every group (after the optional cursor) is streamed
+    as newline-delimited JSON instead, one group per line.
     """
     try:
+        # Reject malformed parameters before touching storage
+        after = request.args.get('after')
+        if after is not None and not CURSOR_PATTERN.fullmatch(after):
+            return _json_response({'success': False, 'message': 'Invalid cursor: expected a lowercase hex sha256'}, 400)
+        try:
+            page = int(request.args.get('page', 1))
+            limit = int(request.args.get('limit', 20))
+        except ValueError:
+            return _json_response({'success': False, 'message': 'page and limit must be integers'}, 400)
+        
         # Get storage instance
         storage_instance = get_storage()
         
+        # Unchanged storage means the client's copy of this exact query is still current
+        last_modified_ns = storage_instance.get_last_modified_ns()
+        etag = None
+        if last_modified_ns is not None:
+            opaque_tag = f'{last_modified_ns:x}-{zlib.crc32(request.query_string):x}'
+            etag = quote_etag(opaque_tag, weak=True)
+            if _not_modified(opaque_tag, last_modified_ns):
+                return _add_cache_headers(app.response_class(status=304), etag, last_modified_ns)
+        
+        if request.args.get('format') == 'ndjson':
+            response = app.response_class(_stream_ndjson(storage_instance, after),
+                                          mimetype='application/x-ndjson')
+            return _add_cache_headers(response, etag, last_modified_ns)
+        
         # Get page parameter (default to 1)
-        page = int(request.args.get('page', 1))
         if page < 1:
             page = 1
             
-        # Get duplicate groups from storage
-        all_groups = storage_instance.get_duplicate_groups()
-        
         # Calculate pagination
-        per_page = 20
-        total_groups = len(all_groups)
+        per_page = min(max(limit, 1), MAX_PER_PAGE)
+        total_groups = storage_instance.count_duplicate_groups()
         total_pages = (total_groups + per_page - 1) // per_page if total_groups > 0 else 1
         
-        # Get the slice of groups for this page
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        groups = all_groups[start_index:end_index]
+        # Only load the groups for this page from storage
+        if after is not None:
+            # Fetch one extra group to know whether another page follows
+            groups = storage_instance.get_duplicate_groups(limit=per_page + 1, after=after)
+            has_more = len(groups) > per_page
+            groups = groups[:per_page]
+        else:
+            start_index = (page - 1) * per_page
+            groups = storage_instance.get_duplicate_groups(limit=per_page, offset=start_index)
+            has_more = page < total_pages
         
-        # Prepare response
-        response = {
-            'success': True,
-            'data': groups,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total_groups': total_groups,
-                'total_pages': total_pages,
-                'has_more': page < total_pages
-            }
+        pagination = {
+            'page': page,
+            'per_page': per_page,
+            'total_groups': total_groups,
+            'total_pages': total_pages,
+            'has_more': has_more,
+            'next_cursor': groups[-1][0]['sha256'] if groups else None
         }
         
-        return jsonify(response)
+        # Stream the response so only one group is serialized at a time
+        response = app.response_class(_stream_duplicates(groups, pagination), mimetype='application/json')
+        return _add_cache_headers(response, etag, last_modified_ns)
         
     except Exception as e:
-        return jsonify({
+        return _json_response({
             'success': False,
             'message': f'Error retrieving duplicates: {str(e)}'
-        }), 500
+        }, 500)
     
 
 # Replace the scan_directory route with:
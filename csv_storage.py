@@ -1,182 +1,543 @@
 import csv
+import io
 import logging
+import mmap
 import os
-import sys
-from typing import Dict, List, Tuple, Optional, Union
-from storage_base import StorageInterface
+import re
+import tempfile
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Optional, Union
+from storage_base import StorageInterface, make_exists_checker
 
 # Constants
 OUTPUT_CSV: str = r"file_list.csv"
 DUPLICATES_CSV: str = r"duplicate_files.csv"
+# Sidecar index of byte offsets where each duplicate group starts in DUPLICATES_CSV
+DUPLICATES_INDEX: str = r"duplicate_files.idx"
+# First word of the index: its format version, which also marks DUPLICATES_CSV as sorted
+# by sha256. Older indexes start with the CSV size instead, which never gets this large.
+DUPLICATES_INDEX_FORMAT: int = 0x4455504C49445802
+# Buffer size for CSV reads and writes, so large files move in few syscalls
+BUFSIZE: int = 1 << 20
+# Number of file rows written together by save_files
+WRITE_BATCH_SIZE: int = 1000
+# Number of duplicate groups whose files are checked together during refresh
+REFRESH_BATCH_SIZE: int = 1024
+# Maximum number of pages kept in the duplicate group cache
+GROUP_CACHE_SIZE: int = 64
 
-# Configure logging to output to a file in the current directory
-# This sets up logging to both a file and console output
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('file_processing.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)  # Also print to console
-    ]
-)
+# Characters that force a CSV field to be quoted
+_needs_quoting = re.compile(r'[",\r\n]').search
+
+# Column layouts written by save_files / save_duplicates
+FILE_COLUMNS: List[str] = ['filename', 'filepath', 'creation_time', 'file_size', 'sha256', 'file_id',
+                           'quick_signature']
+# Columns read back by load_existing_file_cache
+CACHE_COLUMNS: List[str] = ['file_id', 'file_size', 'sha256', 'quick_signature']
+# Cache columns of file lists written before file_id was recorded
+LEGACY_CACHE_COLUMNS: List[str] = ['filepath', 'file_size', 'sha256']
+DUPLICATE_COLUMNS: List[str] = ['sha256', 'filename', 'filepath', 'creation_time', 'file_size', 'duplicate_count']
+
+# Parsed duplicate groups, valid while DUPLICATES_CSV keeps the same mtime and size
+_group_cache: Dict[str, object] = {'signature': None, 'pages': {}, 'count': None, 'sorted': None}
+
+def _duplicates_signature() -> Optional[Tuple[int, int]]:
+    """Get the (mtime_ns, size) of DUPLICATES_CSV, or None if it doesn't exist"""
+    try:
+        stat_info = os.stat(DUPLICATES_CSV)
+    except OSError:
+        return None
+    return (stat_info.st_mtime_ns, stat_info.st_size)
+
+def _cached_groups_for(signature: Optional[Tuple[int, int]]) -> Dict[str, object]:
+    """Get the group cache, resetting it if DUPLICATES_CSV changed since it was filled"""
+    if _group_cache['signature'] != signature:
+        _group_cache['signature'] = signature
+        _group_cache['pages'] = {}
+        _group_cache['count'] = None
+        _group_cache['sorted'] = None
+    return _group_cache
+
+def _invalidate_group_cache() -> None:
+    """Drop cached duplicate groups after DUPLICATES_CSV is rewritten"""
+    _group_cache['signature'] = None
+    _group_cache['pages'] = {}
+    _group_cache['count'] = None
+    _group_cache['sorted'] = None
+
+def _column_indices(header: List[str], columns: List[str]) -> Optional[List[int]]:
+    """Map the requested column names to their positions in a CSV header
+    
+    Returns:
+        Optional[List[int]]: Column positions in the order requested, or None if any column is missing
+    """
+    try:
+        return [header.index(column) for column in columns]
+    except ValueError:
+        return None
+
+def _csv_field(value: str) -> str:
+    """Quote a CSV field the way csv.writer's QUOTE_MINIMAL does, only when it needs it"""
+    if _needs_quoting(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+def _format_file_row(file_data: Dict[str, Union[str, int]]) -> str:
+    """Format one file record as a CSV line in FILE_COLUMNS order
+    
+    file_size, sha256, file_id and quick_signature only ever hold digits, hex
+    and colons, so only the free-text columns go through _csv_field.
+    """
+    return (f"{_csv_field(file_data['filename'])},{_csv_field(file_data['filepath'])},"
+            f"{_csv_field(file_data['creation_time'])},{file_data['file_size']},"
+            f"{file_data['sha256']},{file_data['file_id']},{file_data['quick_signature']}\r\n")
+
+@contextmanager
+def _mapped_csv(path: str, start: Optional[int] = None) -> Iterator[Tuple[List[str], Iterator[List[str]]]]:
+    """Read a CSV through a read-only memory map
+    
+    Args:
+        path (str): CSV file to map
+        start (Optional[int]): Byte offset to start reading data rows from. If None,
+                               rows start right after the header.
+        
+    Yields:
+        Tuple[List[str], Iterator[List[str]]]: The header and a csv.reader over the data rows
+    """
+    with open(path, 'rb') as rawfile:
+        # Empty files cannot be mapped
+        if os.fstat(rawfile.fileno()).st_size == 0:
+            yield [], iter(())
+            return
+        with mmap.mmap(rawfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            header = next(csv.reader([mapped.readline().decode('utf-8')]), [])
+            if start is not None:
+                mapped.seek(start)
+            lines = (line.decode('utf-8') for line in iter(mapped.readline, b''))
+            yield header, csv.reader(lines)
+
+def _stage_duplicate_groups(groups: Iterable[List[Sequence[Union[str, int]]]]) -> Tuple[str, array, int]:
+    """Write duplicate groups to a temporary file next to DUPLICATES_CSV
+    
+    Each group is rendered to an in-memory buffer and encoded before being written,
+    so the byte offset of every group is known without calling tell() on the file.
+    
+    Args:
+        groups (Iterable[List[Sequence[Union[str, int]]]]): Rows of each group, in DUPLICATE_COLUMNS order
+        
+    Returns:
+        Tuple[str, array, int]: Temporary file path, group start offsets and number of rows written
+    """
+    offsets = array('Q')
+    row_count = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DUPLICATE_COLUMNS)
+    
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(DUPLICATES_CSV)))
+    try:
+        with open(fd, 'wb', buffering=BUFSIZE) as csvfile:
+            position = csvfile.write(buffer.getvalue().encode('utf-8'))
+            for rows in groups:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                offsets.append(position)
+                position += csvfile.write(buffer.getvalue().encode('utf-8'))
+                row_count += len(rows)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path, offsets, row_count
+
+def _commit_duplicate_groups(temp_path: str, offsets: array) -> None:
+    """Atomically replace DUPLICATES_CSV with a staged file, and then its index
+    
+    The index is staged too, so readers never see a partially written one. Until
+    it is swapped in, the old index doesn't match the new CSV's size and is ignored.
+    """
+    fd, index_temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(DUPLICATES_INDEX)))
+    try:
+        # The header records the format and the CSV size so a stale index can be detected
+        with open(fd, 'wb') as indexfile:
+            array('Q', [DUPLICATES_INDEX_FORMAT, os.path.getsize(temp_path)]).tofile(indexfile)
+            offsets.tofile(indexfile)
+    except BaseException:
+        os.remove(index_temp_path)
+        os.remove(temp_path)
+        raise
+    
+    _invalidate_group_cache()
+    os.replace(temp_path, DUPLICATES_CSV)
+    os.replace(index_temp_path, DUPLICATES_INDEX)
+
+def _write_duplicate_groups(groups: Iterable[List[Sequence[Union[str, int]]]]) -> int:
+    """Write duplicate groups to DUPLICATES_CSV along with its group index
+    
+    Returns:
+        int: Number of rows written
+    """
+    temp_path, offsets, row_count = _stage_duplicate_groups(groups)
+    _commit_duplicate_groups(temp_path, offsets)
+    return row_count
+
+def _load_duplicate_index() -> Optional[array]:
+    """Load group start offsets for DUPLICATES_CSV
+    
+    Returns:
+        Optional[array]: The offsets, or None if the index is missing, stale or from
+                         before groups were sorted, in which case the CSV may be unsorted
+    """
+    try:
+        index = array('Q')
+        with open(DUPLICATES_INDEX, 'rb') as indexfile:
+            index.frombytes(indexfile.read())
+        if index[:2] == array('Q', [DUPLICATES_INDEX_FORMAT, os.path.getsize(DUPLICATES_CSV)]):
+            return index[2:]
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _first_group_after(index: array, after: str) -> int:
+    """Binary search the group index for the first group whose sha256 sorts after the cursor
+    
+    Relies on groups being written in sha256 order with sha256 as the first column,
+    which a current index from _load_duplicate_index guarantees.
+    """
+    target = after.encode('ascii')
+    with open(DUPLICATES_CSV, 'rb') as rawfile:
+        with mmap.mmap(rawfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            low, high = 0, len(index)
+            while low < high:
+                middle = (low + high) // 2
+                start = index[middle]
+                if mapped[start:mapped.find(b',', start)] <= target:
+                    low = middle + 1
+                else:
+                    high = middle
+    return low
 
 class CSVStorage(StorageInterface):
     """CSV-based storage implementation"""
     
-    def load_existing_file_cache(self) -> Dict[Tuple[str, int], Dict[str, Union[str, int]]]:
-        """Load existing file information from CSV to avoid reprocessing"""
-        file_cache: Dict[Tuple[str, int], Dict[str, Union[str, int]]] = {}
+    def load_existing_file_cache(self) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        """Load the sha256 and quick signature of previously processed files from CSV to avoid reprocessing
+        
+        A file list written before the file_id column existed is keyed by filepath
+        instead, so it still serves as a cache until the next save replaces it.
+        """
+        file_cache: Dict[Tuple[str, int], Tuple[str, str]] = {}
         
         if os.path.exists(OUTPUT_CSV):
             try:
                 logging.info(f"Loading existing file cache from {OUTPUT_CSV}")
-                with open(OUTPUT_CSV, 'r', encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    count = 0
-                    for row in reader:
-                        if all(key in row for key in ['filepath', 'file_size', 'sha256']):
-                            try:
-                                cache_key: Tuple[str, int] = (row['filepath'], int(row['file_size']))
-                                file_cache[cache_key] = {
-                                    'filename': row['filename'],
-                                    'filepath': row['filepath'],
-                                    'creation_time': row['creation_time'],
-                                    'file_size': int(row['file_size']),
-                                    'sha256': row['sha256']
-                                }
-                                count += 1
-                            except (ValueError, KeyError):
-                                continue
-                    logging.info(f"Loaded {count} entries from CSV cache")
+                with open(OUTPUT_CSV, 'r', buffering=BUFSIZE, newline='', encoding='utf-8') as csvfile:
+                    reader = csv.reader(csvfile)
+                    # Resolve the columns we need once from the header and project
+                    # each row by position instead of building a dict per row
+                    header = next(reader, [])
+                    columns = (_column_indices(header, CACHE_COLUMNS) or
+                               _column_indices(header, LEGACY_CACHE_COLUMNS))
+                    if columns is None:
+                        logging.warning(f"Unexpected header in {OUTPUT_CSV}, ignoring cache")
+                        return file_cache
+                    # itemgetter projects each row into a tuple in C; rows too short
+                    # to hold every column are dropped before projection
+                    project = itemgetter(*columns)
+                    width = max(columns) + 1
+                    rows = map(project, (row for row in reader if len(row) >= width))
+                    if len(columns) == len(CACHE_COLUMNS):
+                        entries = ((key, size, (sha256, signature)) for key, size, sha256, signature in rows)
+                    else:
+                        entries = ((key, size, (sha256, '')) for key, size, sha256 in rows)
+                    for key, size, entry in entries:
+                        # Files that were neither hashed nor signed have nothing worth caching
+                        if not entry[0] and not entry[1]:
+                            continue
+                        try:
+                            file_cache[(key, int(size))] = entry
+                        except ValueError:
+                            continue
+                    logging.info(f"Loaded {len(file_cache)} entries from CSV cache")
             except Exception as e:
                 logging.warning(f"Could not load existing CSV file {OUTPUT_CSV}: {e}")
         
         return file_cache
     
-    def save_files(self, file_data_list: List[Optional[Dict[str, Union[str, int]]]]) -> None:
-        """Write all file information to CSV"""
-        headers: List[str] = ['filename', 'filepath', 'creation_time', 'file_size', 'sha256']
-        
-        logging.info(f"Saving {len([f for f in file_data_list if f])} files to {OUTPUT_CSV}")
-        with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            
-            for file_data in file_data_list:
-                if file_data:
-                    writer.writerow(file_data)
-        logging.info("File data saved successfully")
+    def save_files(self, file_data_list: Iterable[Optional[Dict[str, Union[str, int]]]]) -> None:
+        """Write all file information to CSV, in batches as file_data_list is produced
+        
+        Rows go to a temporary file that replaces OUTPUT_CSV once complete, so an
+        interrupted scan leaves the previous file list (and its cache) intact.
+        """
+        file_data_iter = filter(None, file_data_list)
+        saved_count = 0
+        
+        logging.info(f"Saving files to {OUTPUT_CSV}")
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(OUTPUT_CSV)))
+        try:
+            with open(fd, 'w', buffering=BUFSIZE, newline='', encoding='utf-8') as csvfile:
+                csv.writer(csvfile).writerow(FILE_COLUMNS)
+                # Rows are formatted directly rather than through csv.writer, which
+                # is several times slower on rows that rarely need any quoting
+                while batch := list(islice(file_data_iter, WRITE_BATCH_SIZE)):
+                    csvfile.write(''.join(map(_format_file_row, batch)))
+                    saved_count += len(batch)
+            os.replace(temp_path, OUTPUT_CSV)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        logging.info(f"Saved {saved_count} files successfully")
 
     def save_duplicates(self, duplicates: Dict[str, List[Dict[str, Union[str, int]]]]) -> None:
         """Write duplicate files information to CSV"""
-        headers: List[str] = ['sha256', 'filename', 'filepath', 'creation_time', 'file_size', 'duplicate_count']
-        
         total_duplicates = sum(len(files) for files in duplicates.values())
         logging.info(f"Saving {total_duplicates} duplicate entries to {DUPLICATES_CSV}")
         
-        with open(DUPLICATES_CSV, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            
-            for sha256, files in duplicates.items():
+        def rows_by_group():
+            # Groups are written in sha256 order so pages can resume from a cursor
+            for sha256, files in sorted(duplicates.items()):
                 duplicate_count: int = len(files)
-                for file_data in files:
-                    row: Dict[str, Union[str, int]] = file_data.copy()
-                    row['sha256'] = sha256
-                    row['duplicate_count'] = duplicate_count
-                    writer.writerow(row)
+                yield [
+                    (sha256, file_data['filename'], file_data['filepath'],
+                     file_data['creation_time'], file_data['file_size'], duplicate_count)
+                    for file_data in files
+                ]
+        
+        _write_duplicate_groups(rows_by_group())
         logging.info("Duplicate files saved successfully")
 
     def refresh_duplicates(self) -> None:
-        """Refresh the duplicates CSV file by removing entries for files that no longer exist"""
+        """Refresh the duplicates CSV file by removing entries for files that no longer exist
+        
+        Rows of a group are contiguous in the CSV, so this streams batches of groups
+        into a temporary file and swaps it in, holding at most one batch in memory.
+        A CSV without a current index may predate sorted writes, so its remaining
+        groups are sorted by sha256 in memory first, as save_duplicates does.
+        """
         if not os.path.exists(DUPLICATES_CSV):
             logging.info("No duplicates CSV file found, skipping refresh")
             return
             
         logging.info("Refreshing duplicates CSV file")
-        # First pass: Identify which files still exist
-        existing_files_by_sha256: Dict[str, List[dict]] = {}
+        exists = make_exists_checker()
+        filepath_pos = DUPLICATE_COLUMNS.index('filepath')
+        counts = {'kept': 0, 'removed': 0}
         
-        with open(DUPLICATES_CSV, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            headers = reader.fieldnames
-            
-            # Group entries by SHA256
+        def all_files_exist(group: List[Tuple[str, ...]]) -> bool:
+            # Only keep entries if all files in the group exist
+            for entry in group:
+                if not exists(entry[filepath_pos]):
+                    logging.debug(f"File no longer exists: {entry[filepath_pos]}")
+                    counts['removed'] += len(group)
+                    return False
+            counts['kept'] += len(group)
+            return True
+        
+        def grouped_rows(reader: Iterator[List[str]], columns: List[int]) -> Iterator[List[Tuple[str, ...]]]:
+            sha256_idx = columns[0]
+            # Keep rows in DUPLICATE_COLUMNS order
+            project = itemgetter(*columns)
+            group: List[Tuple[str, ...]] = []
+            append = group.append
+            prev_sha256 = None
             for row in reader:
-                sha256 = row['sha256']
-                filepath = row['filepath']
-                
-                if sha256 not in existing_files_by_sha256:
-                    existing_files_by_sha256[sha256] = []
-                
-                existing_files_by_sha256[sha256].append(row)
-        
-        # Check which files exist and identify completely missing groups
-        valid_entries = []
-        removed_count = 0
-        for sha256, entries in existing_files_by_sha256.items():
-            # Check if all files in this group exist
-            all_files_exist = True
-            for entry in entries:
-                if not os.path.exists(entry['filepath']):
-                    all_files_exist = False
-                    logging.debug(f"File no longer exists: {entry['filepath']}")
-                    break
+                sha256 = row[sha256_idx]
+                if sha256 != prev_sha256:
+                    if group:
+                        yield group
+                    group = []
+                    append = group.append
+                    prev_sha256 = sha256
+                append(project(row))
             
-            # Only keep entries if all files in the group exist
-            if all_files_exist:
-                valid_entries.extend(entries)
-            else:
-                removed_count += len(entries)
+            # Don't forget the last group
+            if group:
+                yield group
+        
+        def check_batch(batch: List[List[Tuple[str, ...]]]) -> Iterator[List[Tuple[str, ...]]]:
+            # List the batch's directories concurrently before checking it
+            exists.prefetch(entry[filepath_pos] for group in batch for entry in group)
+            for group in batch:
+                if all_files_exist(group):
+                    yield group
+        
+        def valid_groups(reader: Iterator[List[str]], columns: List[int]) -> Iterator[List[Tuple[str, ...]]]:
+            batch: List[List[Tuple[str, ...]]] = []
+            for group in grouped_rows(reader, columns):
+                batch.append(group)
+                if len(batch) >= REFRESH_BATCH_SIZE:
+                    yield from check_batch(batch)
+                    batch = []
+            yield from check_batch(batch)
         
-        # Write back the filtered entries
-        with open(DUPLICATES_CSV, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(valid_entries)
+        is_sorted = _load_duplicate_index() is not None
+        with _mapped_csv(DUPLICATES_CSV) as (header, reader):
+            columns = _column_indices(header, DUPLICATE_COLUMNS)
+            if columns is None:
+                logging.warning(f"Unexpected header in {DUPLICATES_CSV}, skipping refresh")
+                return
+            groups = valid_groups(reader, columns)
+            if not is_sorted:
+                groups = sorted(groups, key=lambda group: group[0][0])
+            temp_path, offsets, _ = _stage_duplicate_groups(groups)
         
-        logging.info(f"Refreshed duplicates CSV. Removed {removed_count} invalid entries, kept {len(valid_entries)} valid entries")
+        # Swap in the filtered file once the source is no longer mapped
+        _commit_duplicate_groups(temp_path, offsets)
+        
+        logging.info(f"Refreshed duplicates CSV. Removed {counts['removed']} invalid entries, kept {counts['kept']} valid entries")
 
-    def get_duplicate_groups(self, limit: Optional[int] = None) -> List[List[Dict[str, Union[str, int]]]]:
+    def get_duplicate_groups(self, limit: Optional[int] = None, offset: int = 0,
+                             after: Optional[str] = None) -> List[List[Dict[str, Union[str, int]]]]:
         """Get duplicate file groups from CSV for HTML viewer
         
+        Parsed pages are cached until the CSV's mtime or size changes.
+        
         Args:
             limit (Optional[int]): Maximum number of duplicate groups to return. 
                                 If None, returns all groups.
+            offset (int): Number of groups to skip before collecting results.
+            after (Optional[str]): Only return groups whose sha256 sorts after this cursor.
         """
-        groups = []
-        current_group = []
-        prev_sha256 = None
+        cache = _cached_groups_for(_duplicates_signature())
+        pages = cache['pages']
+        page_key = (limit, offset, after)
+        if page_key in pages:
+            return pages[page_key]
         
+        groups = self._read_duplicate_groups(limit, offset, after)
+        if len(pages) >= GROUP_CACHE_SIZE:
+            pages.clear()
+        pages[page_key] = groups
+        return groups
+
+    def _read_duplicate_groups(self, limit: Optional[int], offset: int,
+                               after: Optional[str]) -> List[List[Dict[str, Union[str, int]]]]:
+        """Parse a page of duplicate file groups from CSV"""
         if not os.path.exists(DUPLICATES_CSV):
             logging.info("No duplicates CSV file found")
             return []
         
+        index = _load_duplicate_index()
+        if index is None:
+            return self._read_unindexed_groups(limit, offset, after)
+        
+        # Jump straight to the first requested group
+        first_group = offset
+        if after is not None:
+            first_group += _first_group_after(index, after)
+        if first_group >= len(index):
+            return []
+        
         logging.info(f"Loading duplicate groups from {DUPLICATES_CSV}")
-        with open(DUPLICATES_CSV, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
+        return self._parse_duplicate_groups(index[first_group], limit)
+
+    def _read_unindexed_groups(self, limit: Optional[int], offset: int,
+                               after: Optional[str]) -> List[List[Dict[str, Union[str, int]]]]:
+        """Get a page of duplicate file groups from a CSV that may not be sorted
+        
+        Without a current index the CSV may predate sorted writes, so every group is
+        parsed and sorted by sha256 once, and pages are sliced from that until the
+        CSV changes. The next scan or refresh rewrites it sorted and indexed.
+        """
+        cache = _cached_groups_for(_duplicates_signature())
+        if cache['sorted'] is None:
+            logging.info(f"No current index for {DUPLICATES_CSV}, sorting its groups in memory")
+            all_groups = self._parse_duplicate_groups(None, None)
+            all_groups.sort(key=lambda group: group[0]['sha256'])
+            cache['sorted'] = ([group[0]['sha256'] for group in all_groups], all_groups)
+        
+        keys, all_groups = cache['sorted']
+        first_group = offset
+        if after is not None:
+            first_group += bisect_right(keys, after)
+        return all_groups[first_group:None if limit is None else first_group + limit]
+
+    def _parse_duplicate_groups(self, start: Optional[int],
+                                limit: Optional[int]) -> List[List[Dict[str, Union[str, int]]]]:
+        """Parse duplicate file groups from CSV, starting at a group's byte offset
+        
+        Args:
+            start (Optional[int]): Byte offset of the first group to parse. If None,
+                                   parsing starts with the first group.
+            limit (Optional[int]): Maximum number of groups to return. If None, returns
+                                   every group from start on.
+        """
+        groups = []
+        current_group = []
+        prev_sha256 = None
+        
+        with _mapped_csv(DUPLICATES_CSV, start) as (header, reader):
+            columns = _column_indices(header, DUPLICATE_COLUMNS[:5])
+            if columns is None:
+                logging.warning(f"Unexpected header in {DUPLICATES_CSV}")
+                return []
+            sha256_idx, filename_idx, filepath_idx, ctime_idx, size_idx = columns
             
+            # Bind the appends locally; they run once per row
+            append_group = groups.append
+            append_file = current_group.append
             for row in reader:
-                sha256 = row['sha256']
+                sha256 = row[sha256_idx]
                 if sha256 != prev_sha256:
+                    prev_sha256 = sha256
                     if current_group:
-                        groups.append(current_group)
+                        append_group(current_group)
                         # Apply limit if specified
                         if limit is not None and len(groups) >= limit:
                             break
                         current_group = []
-                current_group.append({
+                        append_file = current_group.append
+                append_file({
                     'sha256': sha256,
-                    'filename': row['filename'],
-                    'filepath': row['filepath'],
-                    'creation_time': row['creation_time'],
-                    'file_size': int(row['file_size'])
+                    'filename': row[filename_idx],
+                    'filepath': row[filepath_idx],
+                    'creation_time': row[ctime_idx],
+                    'file_size': int(row[size_idx])
                 })
-                prev_sha256 = sha256
                 
             # Don't forget the last group (if we haven't reached the limit)
             if current_group and (limit is None or len(groups) < limit):
                 groups.append(current_group)
         
         logging.info(f"Loaded {len(groups)} duplicate groups")
-        return groups
\ No newline at end of file
+        return groups
+
+    def count_duplicate_groups(self) -> int:
+        """Count duplicate file groups in CSV without loading them"""
+        signature = _duplicates_signature()
+        if signature is None:
+            return 0
+        
+        cache = _cached_groups_for(signature)
+        if cache['count'] is None:
+            cache['count'] = self._count_duplicate_groups()
+        return cache['count']
+
+    def _count_duplicate_groups(self) -> int:
+        """Count duplicate file groups using the sidecar index, or by scanning the CSV"""
+        index = _load_duplicate_index()
+        if index is not None:
+            return len(index)
+        
+        count = 0
+        prev_sha256 = None
+        with _mapped_csv(DUPLICATES_CSV) as (header, reader):
+            columns = _column_indices(header, ['sha256'])
+            if columns is None:
+                return 0
+            sha256_idx = columns[0]
+            for row in reader:
+                if row[sha256_idx] != prev_sha256:
+                    count += 1
+                    prev_sha256 = row[sha256_idx]
+        return count
+
+    def get_last_modified_ns(self) -> Optional[int]:
+        """Get the modification time of the duplicates CSV"""
+        signature = _duplicates_signature()
+        return signature[0] if signature is not None else None
@@ -4,13 +4,17 @@ import argparse
 import time
 import os
 import hashlib
+from html import escape
 from datetime import datetime
 import logging
-import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
 import sys
-from collections import defaultdict
-from typing import List, Dict, Tuple, Optional, Any, Union
+from string import Template
+from collections import Counter, defaultdict
+from typing import Iterator, List, Dict, Set, Tuple, Optional, Any, Union
 
 # Import storage modules
 from csv_storage import CSVStorage
@@ -18,7 +22,8 @@ from sqlite_storage import SQLiteStorage
 from storage_base import StorageInterface
 
 # Configure logging to output to a file in the current directory
-# This sets up logging to both a file and console output
+# This sets up logging to both a file and console output. The storage modules
+# only log through the root logger, so this is the single place it's configured.
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -32,6 +37,59 @@ logging.basicConfig(
 storage: Optional[StorageInterface] = None
 # Output HTML file path
 OUTPUT_HTML: str = "duplicate_viewer.html"
+# Number of duplicate groups shown in the HTML viewer
+HTML_VIEWER_GROUPS: int = 10
+# File extensions shown as image previews in the HTML viewer
+IMAGE_EXTENSIONS: frozenset = frozenset(['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff'])
+# Placeholder shown in the HTML viewer for files without an image preview
+NO_PREVIEW_HTML: str = "                <div class=\"file-image\" style=\"display:flex;align-items:center;justify-content:center;background-color:#eee;color:#999;\">No preview</div>\n"
+# HTML viewer markup, parsed once and filled in for every group and file
+GROUP_HEADER_TEMPLATE: Template = Template("""
+    <div class="group">
+        <div class="group-header">
+            <div class="group-title">Group $number ($count duplicates)</div>
+            <div class="sha256">SHA256: $sha256</div>
+        </div>
+        <div class="files-container">
+""")
+IMAGE_PREVIEW_TEMPLATE: Template = Template(
+    "                <img src=\"$path\" alt=\"$name\" class=\"file-image\" onerror=\"this.style.display='none';\">\n")
+FILE_CARD_TEMPLATE: Template = Template("""
+            <div class="file-card">
+$preview                <div class="file-info">
+                    <div class="file-name">$name</div>
+                    <div class="file-path">$path</div>
+                    <div class="file-time">Created: $time</div>
+                    <div class="file-size">$size</div>
+                    <button class="delete-btn" onclick="deleteFile($js_path, this)">Delete File</button>
+                </div>
+            </div>
+""")
+# Photo and video extensions scanned with --media-only
+MEDIA_EXTENSIONS: frozenset = frozenset([
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff', '.tif', '.heic', '.heif',
+    '.raw', '.cr2', '.cr3', '.nef', '.arw', '.dng', '.orf', '.rw2',
+    '.mp4', '.mov', '.avi', '.mkv', '.m4v', '.3gp', '.mts', '.wmv'
+])
+# Format of the creation times stored for each file
+CREATION_TIME_FORMAT: str = '%Y-%m-%d %H:%M:%S'
+# Operating system metadata files that are never worth hashing
+IGNORED_FILE_NAMES: frozenset = frozenset(['.DS_Store', 'Thumbs.db', 'desktop.ini'])
+# Number of threads walking top-level subdirectories in parallel
+SCAN_WORKERS: int = 8
+# Maximum number of directory listings waiting to be processed while walking
+WALK_QUEUE_SIZE: int = 10000
+# Maximum number of files handled by each worker task
+FILE_BATCH_SIZE: int = 1000
+# Read size used when hashing files
+HASH_CHUNK_SIZE: int = 1 << 20
+# Bytes read from each end of a file for its quick signature. Files no larger
+# than twice this are hashed in full straight away.
+QUICK_SIGNATURE_BYTES: int = 64 * 1024
+# Maximum number of processed files waiting for the storage writer thread
+RESULT_QUEUE_SIZE: int = 10000
+# Number of files fully hashed per worker task once quick signatures are known
+HASH_BATCH_SIZE: int = 8
 
 def get_storage(storage_type: str) -> StorageInterface:
     """Get appropriate storage instance based on type"""
@@ -42,12 +100,47 @@ def get_storage(storage_type: str) -> StorageInterface:
     else:
         raise ValueError(f"Unsupported storage type: {storage_type}")
 
-def load_existing_file_cache() -> Dict[Tuple[str, int], Dict[str, Union[str, int]]]:
+def load_existing_file_cache() -> Dict[Tuple[str, int], Tuple[str, str]]:
     """Load existing file information to avoid reprocessing"""
     global storage
     return storage.load_existing_file_cache()
 
 
+def _read_at(fd: int, size: int, offset: int) -> bytes:
+    """Read up to size bytes at offset, with os.pread where the platform has it"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+def calculate_quick_signature(file_path: str, file_size: int) -> Optional[str]:
+    """
+    Calculate a cheap signature from the first and last QUICK_SIGNATURE_BYTES of a file
+    
+    Files of the same size whose signatures differ can't be duplicates, so only
+    files that also match on this signature need a full SHA256.
+    
+    Args:
+        file_path (str): Path to the file to sign
+        file_size (int): Size of the file in bytes
+        
+    Returns:
+        Optional[str]: Signature as hexadecimal string, or None if an error occurs
+    """
+    signature_hash = hashlib.sha256()
+    try:
+        # One open and two positioned reads on a raw descriptor; the path is
+        # only resolved once, which matters on network shares
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            signature_hash.update(_read_at(fd, QUICK_SIGNATURE_BYTES, 0))
+            signature_hash.update(_read_at(fd, QUICK_SIGNATURE_BYTES, max(0, file_size - QUICK_SIGNATURE_BYTES)))
+        finally:
+            os.close(fd)
+        return signature_hash.hexdigest()
+    except Exception:
+        return None
+
 def calculate_sha256(file_path: str) -> Optional[str]:
     """
     Calculate SHA256 hash of a file
@@ -58,77 +151,127 @@ def calculate_sha256(file_path: str) -> Optional[str]:
     Returns:
         Optional[str]: SHA256 hash as hexadecimal string, or None if an error occurs
     """
-    # Initialize SHA256 hasher
+    # Initialize SHA256 hasher. Faster non-cryptographic hashes (xxh3, BLAKE3) would need
+    # a third-party package, and switching would invalidate every sha256 already
+    # stored, so cached files would no longer group with newly hashed ones.
+    # hashlib's SHA256 uses SHA-NI where the CPU has it and releases the GIL while
+    # hashing, so the thread pool already hashes files in parallel.
     sha256_hash = hashlib.sha256()
     try:
-        # Open file in binary mode
-        with open(file_path, "rb") as f:
-            # Read the file in chunks to handle large files efficiently
-            for byte_block in iter(lambda: f.read(4096), b""):
+        # Work on a raw descriptor: small files are then hashed with one open and
+        # a couple of reads, without a buffered file object in between
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            # Files are read rather than memory-mapped: a file truncated while it's
+            # being hashed then fails with an error instead of a SIGBUS that would
+            # kill the whole process. Ask the kernel for aggressive readahead instead.
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            # Read the file in large chunks so each update amortizes the call overhead
+            while byte_block := os.read(fd, HASH_CHUNK_SIZE):
                 sha256_hash.update(byte_block)
+        finally:
+            os.close(fd)
         # Return the hexadecimal representation of the hash
         return sha256_hash.hexdigest()
-    except Exception as e:
+    except Exception:
         # Return None if there's an error reading the file
         return None
 
-def process_single_file_with_cache(file_info: Tuple[str, str], 
-                                 file_cache: Dict[Tuple[str, int], Dict[str, Union[str, int]]]) -> Optional[Dict[str, Union[str, int]]]:
+def calculate_sha256_batch(file_paths: List[str]) -> List[Optional[str]]:
+    """
+    Calculate SHA256 hashes of several files in a single worker task
+    
+    Args:
+        file_paths (List[str]): Paths of the files to hash
+        
+    Returns:
+        List[Optional[str]]: SHA256 hash of each file, None where hashing failed
+    """
+    return [calculate_sha256(file_path) for file_path in file_paths]
+
+def process_single_file_with_cache(file_info: Tuple[str, int, float, str, int], 
+                                 file_cache: Dict[Tuple[str, int], Tuple[str, str]],
+                                 candidate_sizes: Optional[Set[int]] = None,
+                                 quick_check: bool = False) -> Optional[Dict[str, Union[str, int]]]:
     """
     Process a single file and return its information, using cache to skip if possible
     
     Args:
-        file_info (Tuple[str, str]): Tuple containing (file_path, root_directory)
-        file_cache (Dict[Tuple[str, int], Dict[str, Union[str, int]]]): Cache of previously processed files
+        file_info (Tuple[str, int, float, str, int]): Tuple containing (file_path, file_size, ctime,
+                                                      file_id, nlink) as collected from the directory
+                                                      scan, see file_identity
+        file_cache (Dict[Tuple[str, int], Tuple[str, str]]): (sha256, quick_signature) of previously
+                                                             processed files by (file_id, file_size),
+                                                             or by (filepath, file_size) for legacy entries
+        candidate_sizes (Optional[Set[int]]): File sizes shared by more than one file. Files of any
+                                              other size can't have duplicates and are not hashed;
+                                              their sha256 is left empty. If None, every file is hashed.
+        quick_check (bool): If True, files larger than twice QUICK_SIGNATURE_BYTES only get a
+                            'quick_signature' and an empty sha256; finish them with
+                            complete_quick_checked_files.
         
     Returns:
-        Optional[Dict[str, Union[str, int]]]: Dictionary containing file metadata, or None if processing fails
+        Optional[Dict[str, Union[str, int]]]: Dictionary containing file metadata, or None if processing fails.
+                                              Results reusing a cached SHA256 carry 'cached': True.
     """
-    # Extract file path and root directory from tuple
+    # Extract file path and the stat fields gathered by the scan
     file_path: str
-    root: str
-    file_path, root = file_info
+    file_size: int
+    ctime: float
+    file_id: str
+    file_path, file_size, ctime, file_id, _ = file_info
     
     try:
-        # Get file statistics (size, timestamps, etc.)
-        stat_info = os.stat(file_path)
-        
-        # Extract filename from full path
-        filename: str = os.path.basename(file_path)
-        
-        # Full file path
-        filepath: str = file_path
+        cached_sha256: str = ''
+        cached_signature: str = ''
+        # On a first scan the cache is empty, so skip building and hashing the keys
+        if file_cache:
+            # Create cache key using the file's identity rather than its path, so
+            # renamed and moved files are still found in the cache. Fall back to the
+            # path key of entries stored before file identities were recorded.
+            cache_key: Tuple[str, int] = (file_id, file_size)
+            cached_sha256, cached_signature = (file_cache.get(cache_key) or
+                                               file_cache.get((file_path, file_size)) or ('', ''))
         
-        # Format creation time as human-readable string
-        creation_time: str = datetime.fromtimestamp(stat_info.st_ctime).strftime('%Y-%m-%d %H:%M:%S')
+        file_data: Dict[str, Union[str, int]] = {
+            'filename': os.path.basename(file_path),
+            'filepath': file_path,
+            # Format creation time as human-readable string, straight from a time
+            # tuple rather than through a datetime object per file
+            'creation_time': time.strftime(CREATION_TIME_FORMAT, time.localtime(ctime)),
+            'file_size': file_size,
+            'file_id': file_id,
+            'sha256': cached_sha256,
+            'quick_signature': cached_signature
+        }
         
-        # Get file size in bytes
-        file_size: int = stat_info.st_size
+        # Reuse the cached SHA256 if this file was already hashed
+        if cached_sha256:
+            logging.info(f"Skipping SHA256 calculation for {file_path} (already processed)")
+            file_data['cached'] = True
+            return file_data
         
-        # Create cache key using filepath and file size for lookup
-        cache_key: Tuple[str, int] = (filepath, file_size)
+        # No other file has this size, so it can't be a duplicate
+        if candidate_sizes is not None and file_size not in candidate_sizes:
+            return file_data
         
-        # Check if file already exists in cache
-        if cache_key in file_cache:
-            # Retrieve cached entry
-            cached_entry: Dict[str, Union[str, int]] = file_cache[cache_key]
-            # Return cached data if it has a valid SHA256
-            if cached_entry.get('sha256'):
-                logging.info(f"Skipping SHA256 calculation for {filepath} (already processed)")
-                return cached_entry
+        # Defer the full hash of large files until their quick signature
+        # is known to match another file's
+        if quick_check and file_size > 2 * QUICK_SIGNATURE_BYTES:
+            if not cached_signature:
+                file_data['quick_signature'] = calculate_quick_signature(file_path, file_size)
+            if file_data['quick_signature']:
+                return file_data
+            return None
         
         # Calculate SHA256 if not in cache or size changed
         sha256: Optional[str] = calculate_sha256(file_path)
         
         # If SHA256 calculation was successful, return file metadata
         if sha256:
-            return {
-                'filename': filename,
-                'filepath': filepath,
-                'creation_time': creation_time,
-                'file_size': file_size,
-                'sha256': sha256
-            }
+            file_data['sha256'] = sha256
+            return file_data
     except Exception as e:
         # Log error if file processing fails
         logging.error(f"Error processing file {file_path}: {e}")
@@ -136,40 +279,274 @@ def process_single_file_with_cache(file_info: Tuple[str, str],
     # Return None if processing failed
     return None
 
-def collect_files_from_directories(directory_paths: List[str]) -> List[Tuple[str, str]]:
+def process_file_batch(file_infos: List[Tuple[str, int, float, str, int]], 
+                       file_cache: Dict[Tuple[str, int], Tuple[str, str]],
+                       candidate_sizes: Optional[Set[int]] = None,
+                       quick_check: bool = False) -> List[Optional[Dict[str, Union[str, int]]]]:
     """
-    Collect all files from multiple directories
+    Process a batch of files in a single worker task
     
     Args:
-        directory_paths (List[str]): List of directory paths to scan
+        file_infos (List[Tuple[str, int, float, str, int]]): Tuples containing (file_path, file_size, ctime, file_id, nlink)
+        file_cache (Dict[Tuple[str, int], Tuple[str, str]]): Cache of previously processed files
+        candidate_sizes (Optional[Set[int]]): File sizes worth hashing, see process_single_file_with_cache
+        quick_check (bool): Whether to defer full hashes of large files, see process_single_file_with_cache
+        
+    Returns:
+        List[Optional[Dict[str, Union[str, int]]]]: File metadata for each file, None where processing failed
+    """
+    return [process_single_file_with_cache(file_info, file_cache, candidate_sizes, quick_check)
+            for file_info in file_infos]
+
+def needs_full_hash(file_data: Dict[str, Union[str, int]]) -> bool:
+    """Whether a file was only quick-checked and may still need its full SHA256"""
+    return not file_data['sha256'] and bool(file_data['quick_signature'])
+
+def complete_quick_checked_files(quick_checked: List[Dict[str, Union[str, int]]],
+                                 hashed_signatures: Set[Tuple[int, str]],
+                                 unsigned_hashed_sizes: Set[int],
+                                 executor: ThreadPoolExecutor) -> List[Dict[str, Union[str, int]]]:
+    """
+    Calculate full SHA256 hashes for quick-checked files that may still have duplicates
+    
+    A quick-checked file needs its full hash if another file of the same size has
+    the same quick signature, or if a file of the same size already has a full hash
+    but no recorded quick signature to compare against. Other quick-checked files
+    keep an empty sha256, and their quick signature is stored so later scans can
+    compare against it without reading the file again.
+    
+    Args:
+        quick_checked (List[Dict[str, Union[str, int]]]): Metadata of quick-checked files, updated in place
+        hashed_signatures (Set[Tuple[int, str]]): (file_size, quick_signature) of files with a full hash
+        unsigned_hashed_sizes (Set[int]): Sizes of files with a full hash but no quick signature
+        executor (ThreadPoolExecutor): Pool used to calculate the full hashes
+        
+    Returns:
+        List[Dict[str, Union[str, int]]]: Quick-checked file metadata without files whose full hash failed
+    """
+    if not quick_checked:
+        return quick_checked
+    
+    signature_counts: Counter = Counter((r['file_size'], r['quick_signature']) for r in quick_checked)
+    to_hash = [r for r in quick_checked
+               if r['file_size'] in unsigned_hashed_sizes
+               or (r['file_size'], r['quick_signature']) in hashed_signatures
+               or signature_counts[(r['file_size'], r['quick_signature'])] > 1]
+    logging.info(f"Quick signatures ruled out {len(quick_checked) - len(to_hash)} of {len(quick_checked)} "
+                 f"large files; calculating {len(to_hash)} full hashes")
+    
+    # Hash in batches so a worker handles several files per task
+    hash_batches = chunked([r['filepath'] for r in to_hash], HASH_BATCH_SIZE)
+    sha256_results = (sha256 for batch in executor.map(calculate_sha256_batch, hash_batches) for sha256 in batch)
+    failed_paths: Set[str] = set()
+    for result, sha256 in zip(to_hash, sha256_results):
+        if sha256:
+            result['sha256'] = sha256
+        else:
+            logging.error(f"Error calculating SHA256 for {result['filepath']}")
+            failed_paths.add(result['filepath'])
+    
+    return [r for r in quick_checked if r['filepath'] not in failed_paths]
+
+def file_identity(stat_info: os.stat_result, inode: int, device: Optional[int] = None) -> str:
+    """
+    Identify a file by device, inode and modification time
+    
+    The identity survives renames and moves within a filesystem and changes
+    whenever the file's content is modified, so it keys the hash cache.
+    
+    Args:
+        stat_info (os.stat_result): Stat result of the file
+        inode (int): Inode number of the file (DirEntry.inode(), which unlike
+                     DirEntry.stat().st_ino is also filled in on Windows)
+        device (Optional[int]): Device of the file, see volume_device. If None,
+                                stat_info.st_dev is used.
+        
+    Returns:
+        str: Identity as "device:inode:mtime_ns"
+    """
+    if device is None:
+        device = stat_info.st_dev
+    return f"{device}:{inode}:{stat_info.st_mtime_ns}"
+
+def volume_device(directory_path: str) -> Optional[int]:
+    """
+    Get the device to identify the files below a scan root by, where DirEntry can't tell
+    
+    On Windows, DirEntry.stat().st_dev is always 0, so files on separate volumes
+    would share identities. os.stat() does fill in the volume serial number, so
+    it is taken once per scan root there.
+    
+    Args:
+        directory_path (str): Scan root
+        
+    Returns:
+        Optional[int]: The root's device on Windows, None where DirEntry reports devices itself
+    """
+    if os.name != 'nt':
+        return None
+    try:
+        return os.stat(directory_path).st_dev
+    except OSError:
+        return None
+
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """Split a list into consecutive chunks of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def scan_directory(root: str, extensions: Optional[Set[str]] = None,
+                   device: Optional[int] = None) -> Tuple[List[Tuple[str, int, float, str, int]], List[str]]:
+    """
+    List the files and subdirectories directly inside one directory
+    
+    Uses os.scandir and keeps the stat result of each entry, so files aren't
+    stat'ed again when they are processed. Like os.walk, symlinked directories
+    are listed but not descended into.
+    
+    Args:
+        root (str): Directory to list
+        extensions (Optional[Set[str]]): Lowercase extensions (with the dot) to collect.
+                                         If None, files of every extension are collected.
+        device (Optional[int]): Device of the scan root, see volume_device
         
     Returns:
-        List[Tuple[str, str]]: List of tuples containing (file_path, root_directory)
-    """
-    # Initialize list to store file information
-    files_to_process: List[Tuple[str, str]] = []
-    
-    # Iterate through each directory path
-    for directory_path in directory_paths:
-        # Check if directory exists
-        if not os.path.exists(directory_path):
-            # Log warning and skip if directory doesn't exist
-            logging.warning(f"Directory does not exist: {directory_path}")
-            continue
+        Tuple[List[Tuple[str, int, float, str, int]], List[str]]: File tuples as returned by
+            collect_files_from_directories, and the subdirectories to descend into
+    """
+    files: List[Tuple[str, int, float, str, int]] = []
+    subdirs: List[str] = []
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+                    # Filter by name before paying for a stat call
+                    if entry.name in IGNORED_FILE_NAMES:
+                        continue
+                    if extensions is not None and os.path.splitext(entry.name)[1].lower() not in extensions:
+                        continue
+                    stat_info = entry.stat()
+                except OSError:
+                    # Broken symlinks and entries that vanished during the scan
+                    continue
+                files.append((entry.path, stat_info.st_size, stat_info.st_ctime,
+                              file_identity(stat_info, entry.inode(), device), stat_info.st_nlink))
+    except OSError as e:
+        logging.warning(f"Cannot scan directory {root}: {e}")
+    return files, subdirs
+
+def scan_tree(directory_path: str, extensions: Optional[Set[str]],
+              files_queue: queue.Queue, stop_walk: threading.Event,
+              device: Optional[int] = None) -> None:
+    """
+    Walk all directories below directory_path, see scan_directory
+    
+    Args:
+        directory_path (str): Directory tree to scan
+        extensions (Optional[Set[str]]): Extensions to collect, see scan_directory
+        files_queue (queue.Queue): Receives the files of each directory as a list,
+                                   followed by None once the whole tree is walked
+        stop_walk (threading.Event): Set to end the walk early
+        device (Optional[int]): Device of the scan root, see volume_device
+    """
+    try:
+        pending_dirs: List[str] = [directory_path]
+        while pending_dirs and not stop_walk.is_set():
+            files, subdirs = scan_directory(pending_dirs.pop(), extensions, device)
+            if files:
+                files_queue.put(files)
+            pending_dirs.extend(subdirs)
+    finally:
+        files_queue.put(None)
+
+def iter_files_from_directories(directory_paths: List[str],
+                                extensions: Optional[Set[str]] = None) -> Iterator[List[Tuple[str, int, float, str, int]]]:
+    """
+    Yield the files of multiple directories, one directory listing at a time, while they are walked
+    
+    Each top-level subdirectory is walked on its own thread, so the directory
+    listings of separate trees overlap on slow disks and network shares, and
+    callers can start on the first files before the walk is finished. At most
+    WALK_QUEUE_SIZE listings are buffered ahead of the caller, and the walkers
+    stop if the caller stops iterating.
+    
+    Args:
+        directory_paths (List[str]): List of directory paths to scan
+        extensions (Optional[Set[str]]): Lowercase extensions (with the dot) to collect.
+                                         If None, files of every extension are collected.
+        
+    Yields:
+        List[Tuple[str, int, float, str, int]]: Tuples containing (file_path, file_size, ctime, file_id, nlink)
+    """
+    files_queue: queue.Queue = queue.Queue(maxsize=WALK_QUEUE_SIZE)
+    stop_walk: threading.Event = threading.Event()
+    
+    # At least one walker per root, so every drive being scanned stays busy
+    with ThreadPoolExecutor(max_workers=max(SCAN_WORKERS, len(directory_paths))) as executor:
+        root_subdirs: List[List[Tuple[str, Optional[int]]]] = []
+        
+        # Iterate through each directory path
+        for directory_path in directory_paths:
+            # Check if directory exists
+            if not os.path.exists(directory_path):
+                # Log warning and skip if directory doesn't exist
+                logging.warning(f"Directory does not exist: {directory_path}")
+                continue
+                
+            # Log directory scanning progress
+            logging.info(f"Scanning directory: {directory_path}")
             
-        # Log directory scanning progress
-        logging.info(f"Scanning directory: {directory_path}")
+            # List the top level here and hand each subdirectory's tree to a walker thread
+            device: Optional[int] = volume_device(directory_path)
+            files, subdirs = scan_directory(directory_path, extensions, device)
+            if files:
+                yield files
+            root_subdirs.append([(subdir, device) for subdir in subdirs])
+        
+        # Interleave the subtrees of the roots, so separate roots (often separate
+        # drives) are walked at the same time instead of one after the other
+        subtree_futures: List[Any] = [
+            executor.submit(scan_tree, subdir[0], extensions, files_queue, stop_walk, subdir[1])
+            for subdir in chain.from_iterable(zip_longest(*root_subdirs)) if subdir is not None]
+        
+        # Every walker ends its output with None
+        remaining_walkers: int = len(subtree_futures)
+        try:
+            while remaining_walkers:
+                files = files_queue.get()
+                if files is None:
+                    remaining_walkers -= 1
+                else:
+                    yield files
+        finally:
+            if remaining_walkers:
+                # The caller stopped early: stop the walkers, and keep draining so
+                # none stays blocked on the full queue
+                stop_walk.set()
+                while remaining_walkers:
+                    if files_queue.get() is None:
+                        remaining_walkers -= 1
         
-        # Walk through directory tree
-        for root, dirs, files in os.walk(directory_path):
-            # Process each file in the directory
-            for file in files:
-                # Construct full file path
-                file_path: str = os.path.join(root, file)
-                # Add file information to processing list
-                files_to_process.append((file_path, root))
+        for future in subtree_futures:
+            future.result()
+
+def collect_files_from_directories(directory_paths: List[str],
+                                   extensions: Optional[Set[str]] = None) -> List[Tuple[str, int, float, str, int]]:
+    """
+    Collect all files from multiple directories, see iter_files_from_directories
     
-    return files_to_process
+    Args:
+        directory_paths (List[str]): List of directory paths to scan
+        extensions (Optional[Set[str]]): Extensions to collect, see iter_files_from_directories
+        
+    Returns:
+        List[Tuple[str, int, float, str, int]]: List of tuples containing (file_path, file_size, ctime, file_id, nlink)
+    """
+    return [file_info for files in iter_files_from_directories(directory_paths, extensions) for file_info in files]
 
 def find_duplicates(file_data_list: List[Optional[Dict[str, Union[str, int]]]]) -> Dict[str, List[Dict[str, Union[str, int]]]]:
     """
@@ -187,8 +564,9 @@ def find_duplicates(file_data_list: List[Optional[Dict[str, Union[str, int]]]])
     # Group files by SHA256 hash
     file_data: Optional[Dict[str, Union[str, int]]]
     for file_data in file_data_list:
-        # Check if file data exists and contains SHA256 hash
-        if file_data and 'sha256' in file_data:
+        # Check if file data exists and contains SHA256 hash (files with a
+        # unique size are never hashed)
+        if file_data and file_data.get('sha256'):
             # Group file by its SHA256 hash
             sha256_groups[file_data['sha256']].append(file_data)
     
@@ -202,120 +580,318 @@ def find_duplicates(file_data_list: List[Optional[Dict[str, Union[str, int]]]])
 
 
 def process_multiple_directories(directory_paths: List[str], 
-                               max_workers: Optional[int] = None) -> List[Optional[Dict[str, Union[str, int]]]]:
+                               max_workers: Optional[int] = None,
+                               extensions: Optional[Set[str]] = None) -> int:
     """
     Process multiple directories and generate file information with duplicate detection
     
+    Files are processed while the directories are still being walked: as soon as
+    a file size has been seen twice, the files of that size are submitted for
+    hashing. Files whose size stays unique until the walk ends are stored
+    without a hash, and hard links take over the hash of the file they link
+    to. File metadata is handed to a background writer thread as soon as it's
+    final, so only files that may still be duplicates are kept in memory.
+    
     Args:
         directory_paths (List[str]): List of directory paths to process
-        max_workers (Optional[int]): Maximum number of worker processes to use
+        max_workers (Optional[int]): Maximum number of worker threads to use
+        extensions (Optional[Set[str]]): Only process files with these extensions, see
+                                         collect_files_from_directories
         
     Returns:
-        List[Optional[Dict[str, Union[str, int]]]]: List of processed file metadata
+        int: Number of files processed successfully
     """
     global storage
     # Log start of processing
     logging.info(f"Starting to process {len(directory_paths)} directories: {directory_paths}")
     
     # Load existing file cache to avoid reprocessing
-    file_cache: Dict[Tuple[str, int], Dict[str, Union[str, int]]] = load_existing_file_cache()
+    file_cache: Dict[Tuple[str, int], Tuple[str, str]] = load_existing_file_cache()
     
-    # Collect all files from all directories
+    # Start walking all directories; the first listing tells whether there's anything to do
     logging.info("Collecting files from all directories...")
-    files_to_process: List[Tuple[str, str]] = collect_files_from_directories(directory_paths)
-    total_files: int = len(files_to_process)
-    logging.info(f"Found {total_files} files to process")
+    file_listings: Iterator[List[Tuple[str, int, float, str, int]]] = iter_files_from_directories(
+        directory_paths, extensions)
+    first_listing: Optional[List[Tuple[str, int, float, str, int]]] = next(file_listings, None)
     
     # Return early if no files found
-    if total_files == 0:
+    if first_listing is None:
         logging.warning("No files found to process")
-        return []
+        return 0
     
-    # Determine number of worker processes based on CPU cores if not specified
+    # Determine number of worker threads based on CPU cores if not specified.
+    # Hashing and file I/O release the GIL, so threads run them in parallel
+    # while sharing file_cache instead of pickling it into every task.
     if max_workers is None:
-        max_workers = min(32, (mp.cpu_count() or 1) + 4)
+        max_workers = min(32, (os.cpu_count() or 1) + 4)
     
-    # Initialize counters and results list
+    # Initialize counters
+    total_files: int = 0
+    walk_finished: bool = False
     processed_count: int = 0
     successful_count: int = 0
-    file_results: List[Optional[Dict[str, Union[str, int]]]] = []
     skipped_count: int = 0
+    linked_count: int = 0
+    # Hashed files are kept for duplicate detection (unless the storage groups
+    # them itself), quick-checked files until their full hash is settled;
+    # everything else only passes through the queue
+    collect_duplicates: bool = not storage.queries_duplicates
+    hashed_results: List[Dict[str, Union[str, int]]] = []
+    hashed_signatures: Set[Tuple[int, str]] = set()
+    unsigned_hashed_sizes: Set[int] = set()
+    quick_checked: List[Dict[str, Union[str, int]]] = []
+    # Hash of every file that may have hard links and is queued for hashing, by
+    # (file_id, file_size) ('' until hashed), and the further hard links to
+    # those files, which take over the hash instead of reading the same content again
+    candidate_hashes: Dict[Tuple[str, int], str] = {}
+    links: List[Tuple[str, int, float, str, int]] = []
+    results_queue: queue.Queue = queue.Queue(maxsize=RESULT_QUEUE_SIZE)
+    # Queued instead of the final None when the scan fails, so storage doesn't
+    # take the partial results for a complete scan
+    scan_aborted: object = object()
+    stream_ended: bool = False
     
-    # Process files in parallel with status monitoring
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks with cache information
-        future_to_file: Dict[Any, str] = {
-            executor.submit(process_single_file_with_cache, file_info, file_cache): file_info[0] 
-            for file_info in files_to_process
-        }
-        
-        # Log start of parallel processing
-        logging.info(f"Started processing with {max_workers} workers")
-        
-        # Process completed tasks as they finish
-        start_time: float = time.time()
-        last_status_time: float = start_time
-        
-        future: Any
-        for future in as_completed(future_to_file):
-            processed_count += 1
-            file_path: str = future_to_file[future]
-            
-            try:
-                # Get result from completed task
-                result: Optional[Dict[str, Union[str, int]]] = future.result()
-                if result:
-                    file_results.append(result)
-                    # Check if this was a cached result
-                    cache_key: Tuple[str, int] = (result['filepath'], result['file_size'])
-                    if cache_key in file_cache and file_cache[cache_key].get('sha256') == result['sha256']:
-                        skipped_count += 1
-                    successful_count += 1
-            except Exception as e:
-                # Log error if task failed
-                logging.error(f"Error getting result for {file_path}: {e}")
-            
-            # Provide regular status updates
-            current_time: float = time.time()
-            if (processed_count % max(1, total_files // 50) == 0 or 
-                current_time - last_status_time >= 30 or  # Every 30 seconds
-                processed_count == total_files):
+    def queued_results() -> Iterator[Dict[str, Union[str, int]]]:
+        nonlocal stream_ended
+        while True:
+            result = results_queue.get()
+            if result is None or result is scan_aborted:
+                stream_ended = True
+                if result is scan_aborted:
+                    # save_files keeps what it already saved, but doesn't finish
+                    # the save (dropping files this scan didn't reach)
+                    raise RuntimeError("Scan was interrupted before all files were processed")
+                return
+            yield result
+    
+    def write_results() -> None:
+        nonlocal stream_ended
+        try:
+            storage.save_files(queued_results())
+        except BaseException:
+            # Keep draining so producers never block on a full queue
+            while not stream_ended:
+                result = results_queue.get()
+                stream_ended = result is None or result is scan_aborted
+            raise
+    
+    def emit(result: Dict[str, Union[str, int]]) -> None:
+        if result['sha256']:
+            if collect_duplicates:
+                hashed_results.append(result)
+            link_key: Tuple[str, int] = (result['file_id'], result['file_size'])
+            if link_key in candidate_hashes:
+                candidate_hashes[link_key] = result['sha256']
+            if result['quick_signature']:
+                hashed_signatures.add((result['file_size'], result['quick_signature']))
+            else:
+                unsigned_hashed_sizes.add(result['file_size'])
+        results_queue.put(result)
+    
+    # Process files in parallel with status monitoring, writing results as they arrive
+    logging.info("Writing all file information")
+    with ThreadPoolExecutor(max_workers=1) as writer_executor:
+        writer_future = writer_executor.submit(write_results)
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Finished batches are handed back to this thread through a queue,
+                # so results are collected in between directory listings
+                future_to_batch: Dict[Any, List[Tuple[str, int, float, str, int]]] = {}
+                finished_futures: queue.Queue = queue.Queue()
+                
+                start_time: float = time.time()
+                last_status_time: float = start_time
+                next_status_count: int = 1
+                
+                def submit(batch: List[Tuple[str, int, float, str, int]], candidate_sizes: Optional[Set[int]],
+                           cache: Dict[Tuple[str, int], Tuple[str, str]] = file_cache,
+                           quick_check: bool = True) -> Any:
+                    future = executor.submit(process_file_batch, batch, cache, candidate_sizes, quick_check)
+                    future_to_batch[future] = batch
+                    future.add_done_callback(finished_futures.put)
+                    return future
+                
+                # Batches of hard links, whose "cached" results reuse a hash found by this scan
+                link_futures: Set[Any] = set()
+                
+                def collect_finished(block: bool) -> None:
+                    nonlocal processed_count, successful_count, skipped_count, linked_count
+                    nonlocal last_status_time, next_status_count
+                    while future_to_batch:
+                        try:
+                            future = finished_futures.get(block=block)
+                        except queue.Empty:
+                            return
+                        batch: List[Tuple[str, int, float, str, int]] = future_to_batch.pop(future)
+                        processed_count += len(batch)
+                        
+                        try:
+                            # Get results from completed batch
+                            result: Optional[Dict[str, Union[str, int]]]
+                            for result in future.result():
+                                if result:
+                                    # The worker flags results served from the cache
+                                    if result.pop('cached', False):
+                                        if future in link_futures:
+                                            linked_count += 1
+                                        else:
+                                            skipped_count += 1
+                                    successful_count += 1
+                                    if needs_full_hash(result):
+                                        quick_checked.append(result)
+                                    else:
+                                        emit(result)
+                        except Exception as e:
+                            # Log error if task failed
+                            logging.error(f"Error getting results for batch starting at {batch[0][0]}: {e}")
+                        
+                        # Provide regular status updates
+                        current_time: float = time.time()
+                        if (processed_count >= next_status_count or 
+                            current_time - last_status_time >= 30 or  # Every 30 seconds
+                            (walk_finished and processed_count == total_files)):
+                            
+                            # Calculate processing speed
+                            elapsed_time: float = current_time - start_time
+                            files_per_second: float = processed_count / elapsed_time if elapsed_time > 0 else 0
+                            
+                            # Log progress information; the total only counts files found so far
+                            # until the walk is finished
+                            logging.info(f"Progress: {processed_count}/{total_files}{'' if walk_finished else '+'} files "
+                                       f"({successful_count} successful, {skipped_count} skipped, "
+                                       f"{files_per_second:.1f} files/sec, "
+                                       f"{max_workers} workers active)")
+                            last_status_time = current_time
+                            next_status_count = processed_count + max(1, total_files // 50)
+                
+                # Only files sharing a size with another file can be duplicates. The first
+                # file of each size waits here until a second one turns up; None marks
+                # sizes already known to be shared.
+                first_of_size: Dict[int, Optional[Tuple[str, int, float, str, int]]] = {}
+                pending: List[Tuple[str, int, float, str, int]] = []
+                
+                def add_candidate(file_info: Tuple[str, int, float, str, int]) -> None:
+                    # Hard links share their file_id and size. Files with a single link
+                    # can't be one; a link count of 0 means DirEntry didn't report it.
+                    if file_info[4] != 1:
+                        link_key: Tuple[str, int] = (file_info[3], file_info[1])
+                        if link_key in candidate_hashes:
+                            links.append(file_info)
+                            return
+                        candidate_hashes[link_key] = ''
+                    pending.append(file_info)
+                
+                for files in chain([first_listing], file_listings):
+                    total_files += len(files)
+                    for file_info in files:
+                        file_size: int = file_info[1]
+                        if file_size in first_of_size:
+                            first_file = first_of_size[file_size]
+                            if first_file is not None:
+                                add_candidate(first_file)
+                                first_of_size[file_size] = None
+                            add_candidate(file_info)
+                        else:
+                            first_of_size[file_size] = file_info
+                    
+                    # Submit one task per batch of files rather than per file, keeping batches
+                    # small enough on modest scans that every worker still gets several
+                    batch_size: int = max(1, min(FILE_BATCH_SIZE, total_files // (max_workers * 4)))
+                    while len(pending) >= batch_size:
+                        submit(pending[:batch_size], None)
+                        del pending[:batch_size]
+                    collect_finished(block=False)
                 
-                # Calculate processing speed
-                elapsed_time: float = current_time - start_time
-                files_per_second: float = processed_count / elapsed_time if elapsed_time > 0 else 0
+                walk_finished = True
+                logging.info(f"Found {total_files} files to process")
+                if pending:
+                    submit(pending, None)
                 
-                # Log progress information
-                logging.info(f"Progress: {processed_count}/{total_files} files "
-                           f"({successful_count} successful, {skipped_count} skipped, "
-                           f"{files_per_second:.1f} files/sec, "
-                           f"{max_workers} workers active)")
-                last_status_time = current_time
+                # Files whose size is still unique can't have duplicates; they are only
+                # recorded (an empty set of candidate sizes means nothing gets hashed)
+                unique_files: List[Tuple[str, int, float, str, int]] = [
+                    file_info for file_info in first_of_size.values() if file_info is not None]
+                logging.info(f"Found {len(first_of_size) - len(unique_files)} file sizes shared by more than one file")
+                del first_of_size
+                for batch in chunked(unique_files, FILE_BATCH_SIZE):
+                    submit(batch, set())
+                del unique_files
+                collect_finished(block=True)
+                
+                # Files with hard links always have a duplicate, so they need their full hash
+                linked_keys: Set[Tuple[str, int]] = {(file_info[3], file_info[1]) for file_info in links}
+                for result in quick_checked:
+                    if (result['file_id'], result['file_size']) in linked_keys:
+                        hashed_signatures.add((result['file_size'], result['quick_signature']))
+                
+                # Fully hash the large files whose quick signature matched another file
+                completed: List[Dict[str, Union[str, int]]] = complete_quick_checked_files(
+                    quick_checked, hashed_signatures, unsigned_hashed_sizes, executor)
+                successful_count -= len(quick_checked) - len(completed)
+                for result in completed:
+                    emit(result)
+                
+                # Hard links reuse the hash of the file they link to; links to files
+                # whose hash failed are hashed themselves
+                if links:
+                    logging.info(f"Reusing hashes for {len(links)} hard links")
+                    link_cache: Dict[Tuple[str, int], Tuple[str, str]] = {
+                        link_key: (candidate_hashes[link_key], '')
+                        for link_key in linked_keys if candidate_hashes[link_key]}
+                    for batch in chunked(links, FILE_BATCH_SIZE):
+                        link_futures.add(submit(batch, None, link_cache, False))
+                    collect_finished(block=True)
+        except BaseException:
+            # Stop the walk, and the writer without completing the save
+            file_listings.close()
+            results_queue.put(scan_aborted)
+            raise
+        # Let the writer finish once every result is queued
+        results_queue.put(None)
+        writer_future.result()
     
     # Log completion summary
     logging.info(f"Completed processing. Total files processed: {successful_count}/{total_files} "
-               f"({skipped_count} files skipped due to caching)")
-    
-    # Write all files to CSV
-    logging.info(f"Writing all file information")
-    storage.save_files(file_results)
+               f"({skipped_count} files skipped due to caching, "
+               f"{linked_count} hard links reused the hash of their file)")
     
     # Find and write duplicates if requested
+    if not collect_duplicates:
+        logging.info("Duplicate files are grouped by the storage when queried")
+        return successful_count
     logging.info("Finding duplicate files...")
-    duplicates = find_duplicates(file_results)
+    duplicates = find_duplicates(hashed_results)
     if duplicates:
-        logging.info(f"Writing duplicate file information to {DUPLICATES_CSV}")
+        logging.info("Writing duplicate file information")
         storage.save_duplicates(duplicates)
     else:
         logging.info("No duplicate files found")    
     
-    return file_results
+    return successful_count
+
+def format_file_size(file_size: int) -> str:
+    """
+    Format a file size in whole bytes, KB or MB for display
+    
+    Args:
+        file_size (int): File size in bytes
+        
+    Returns:
+        str: Human-readable file size
+    """
+    if file_size < 1024:
+        return f"{file_size} bytes"
+    elif file_size < 1024*1024:
+        return f"{file_size//1024} KB"
+    else:
+        return f"{file_size//(1024*1024)} MB"
 
 def generate_html_viewer() -> None:
     """
     Generate an HTML page to view the first 10 groups of duplicate images
     """
-    groups = storage.get_duplicate_groups()
+    # Storage returns groups in sha256 order and stops reading once it has enough
+    groups = storage.get_duplicate_groups(limit=HTML_VIEWER_GROUPS)
 
     
     # Generate HTML
@@ -466,64 +1042,42 @@ def generate_html_viewer() -> None:
     </script>
 """
 
+    # Collect the page in a list and join it once, instead of re-copying
+    # the whole page on every += as it grows
+    html_parts: List[str] = [html_content]
+    append = html_parts.append
+    
     # Add first 10 groups to HTML
-    for i, group in enumerate(groups[:10]):
-        sha256 = group[0]['sha256']
-        html_content += f"""
-    <div class="group">
-        <div class="group-header">
-            <div class="group-title">Group {i+1} ({len(group)} duplicates)</div>
-            <div class="sha256">SHA256: {sha256}</div>
-        </div>
-        <div class="files-container">
-"""
+    for i, group in enumerate(groups):
+        append(GROUP_HEADER_TEMPLATE.substitute(number=i + 1, count=len(group), sha256=group[0]['sha256']))
         
         for file_info in group:
-            file_path = file_info['filepath']
-            file_name = file_info['filename']
-            file_size = int(file_info['file_size'])
-            creation_time = file_info.get('creation_time', 'Unknown')
-            
-            # Format file size
-            if file_size < 1024:
-                size_str = f"{file_size} bytes"
-            elif file_size < 1024*1024:
-                size_str = f"{file_size//1024} KB"
-            else:
-                size_str = f"{file_size//(1024*1024)} MB"
+            # Names and paths can contain markup characters, so escape them for HTML
+            file_name = escape(file_info['filename'])
+            file_path = escape(file_info['filepath'])
             
             # Try to determine if it's an image based on extension
-            ext = Path(file_name).suffix.lower()
-            is_image = ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff']
-            
-            # Escape backslashes for JavaScript
-            js_safe_path = file_path.replace('\\', '\\\\')
-            
-            html_content += f"""
-            <div class="file-card">
-"""
-            
-            if is_image:
-                html_content += f"                <img src=\"{file_path}\" alt=\"{file_name}\" class=\"file-image\" onerror=\"this.style.display='none';\">\n"
+            if os.path.splitext(file_info['filename'])[1].lower() in IMAGE_EXTENSIONS:
+                preview = IMAGE_PREVIEW_TEMPLATE.substitute(path=file_path, name=file_name)
             else:
-                html_content += f"                <div class=\"file-image\" style=\"display:flex;align-items:center;justify-content:center;background-color:#eee;color:#999;\">No preview</div>\n"
+                preview = NO_PREVIEW_HTML
             
-            html_content += f"""                <div class="file-info">
-                    <div class="file-name">{file_name}</div>
-                    <div class="file-path">{file_path}</div>
-                    <div class="file-time">Created: {creation_time}</div>
-                    <div class="file-size">{size_str}</div>
-                    <button class="delete-btn" onclick="deleteFile('{js_safe_path}', this)">Delete File</button>
-                </div>
-            </div>
-"""
+            append(FILE_CARD_TEMPLATE.substitute(
+                preview=preview,
+                name=file_name,
+                path=file_path,
+                time=file_info.get('creation_time', 'Unknown'),
+                size=format_file_size(file_info['file_size']),
+                # A JSON string is a valid JavaScript string literal, whatever the path contains
+                js_path=escape(json.dumps(file_info['filepath']))))
         
-        html_content += "        </div>\n    </div>\n"
+        append("        </div>\n    </div>\n")
 
-    html_content += """
+    append("""
 </body>
 </html>
-"""
+""")
+    html_content = "".join(html_parts)
     
     # Write HTML to file
     with open(OUTPUT_HTML, 'w', encoding='utf-8') as f:
@@ -534,6 +1088,28 @@ def generate_html_viewer() -> None:
 
 # Add these constants near the top of the file
 CONFIG_FILE = "config.json"
+# Storage used when neither the command line nor the configuration names one
+DEFAULT_STORAGE_TYPE = "sqlite"
+# Environment variable that overrides the configured storage type for one run
+STORAGE_TYPE_ENV = "STORAGE_TYPE"
+# Storage types accepted from the configuration and the environment
+STORAGE_TYPES = ("csv", "sqlite")
+
+def _normalize_storage_type(storage_type: Optional[str]) -> Optional[str]:
+    """Return storage_type in the form get_storage expects, or None if it isn't a known type"""
+    if not isinstance(storage_type, str):
+        return None
+    storage_type = storage_type.strip().lower()
+    return storage_type if storage_type in STORAGE_TYPES else None
+
+def storage_type_override() -> Optional[str]:
+    """
+    Get the storage type set by the STORAGE_TYPE environment variable
+    
+    Returns:
+        Optional[str]: The normalized storage type, or None if the variable is unset or unknown
+    """
+    return _normalize_storage_type(os.environ.get(STORAGE_TYPE_ENV))
 
 def save_storage_config(storage_type: str) -> None:
     """
@@ -556,16 +1132,31 @@ def save_storage_config(storage_type: str) -> None:
 
 def load_storage_config() -> Optional[str]:
     """
-    Load storage configuration from JSON file
+    Load storage configuration, preferring the STORAGE_TYPE environment
+    variable over the JSON file so deployments can skip the file entirely
+    
+    Unknown storage types are logged and ignored, so callers fall back to
+    the next source (or the default) instead of failing to start.
     
     Returns:
         Optional[str]: The storage type from config, or None if not found
     """
+    env_value = os.environ.get(STORAGE_TYPE_ENV)
+    if env_value:
+        storage_type = storage_type_override()
+        if storage_type:
+            logging.info(f"Using storage type from {STORAGE_TYPE_ENV}: {storage_type}")
+            return storage_type
+        logging.warning(f"Ignoring unknown storage type in {STORAGE_TYPE_ENV}: {env_value!r}")
+    
     try:
         if Path(CONFIG_FILE).exists():
             with open(CONFIG_FILE, 'r') as f:
                 config = json.load(f)
-            storage_type = config.get("storage_type")
+            storage_type = _normalize_storage_type(config.get("storage_type"))
+            if storage_type is None:
+                logging.warning(f"Ignoring unknown storage type in {CONFIG_FILE}: {config.get('storage_type')!r}")
+                return None
             logging.info(f"Loaded storage configuration: {storage_type}")
             return storage_type
         else:
@@ -591,16 +1182,16 @@ def scan_directories_api(directory_paths: List[str]) -> Dict[str, Union[bool, st
         # Initialize storage based on config
         storage_type = load_storage_config()
         if not storage_type:
-            storage_type = 'csv'
+            storage_type = DEFAULT_STORAGE_TYPE
         storage = get_storage(storage_type)
         
         # Process directories
-        results = process_multiple_directories(directory_paths)
+        files_processed = process_multiple_directories(directory_paths)
         
         return {
             'success': True,
             'message': 'Directory scanned successfully',
-            'files_processed': len([r for r in results if r is not None])
+            'files_processed': files_processed
         }
     except Exception as e:
         return {
@@ -612,17 +1203,21 @@ def scan_directories_api(directory_paths: List[str]) -> Dict[str, Union[bool, st
 # Modified main function
 def main():
     """
-    # Use CSV storage (default)
+    # Use SQLite storage (default)
     python photo.py --directories "F:\\photo" "G:\\视频"
 
-    # Use SQLite storage
-    python photo.py --storage sqlite --directories "F:\\photo" "G:\\视频"
+    # Use CSV storage
+    python photo.py --storage csv --directories "F:\\photo" "G:\\视频"
 
     # Refresh duplicates with SQLite
     python photo.py --storage sqlite --refresh
 
     # Refresh duplicates with SQLite
     python photo.py --storage csv --refresh
+
+    # Only scan photos and videos, or only the given extensions
+    python photo.py --media-only --directories "F:\\photo"
+    python photo.py --extensions .jpg .png --directories "F:\\photo"
     """
 
     parser = argparse.ArgumentParser(description='Find duplicate files')
@@ -634,6 +1229,10 @@ def main():
                        help='Directories to scan for duplicates')
     parser.add_argument('--generate-html', action='store_true',
                        help='Generate HTML viewer after processing')
+    parser.add_argument('--extensions', nargs='+', default=None,
+                       help='Only scan files with these extensions (e.g. .jpg .png)')
+    parser.add_argument('--media-only', action='store_true',
+                       help='Only scan photo and video files')
     
     args = parser.parse_args()
     print(args)
@@ -646,12 +1245,14 @@ def main():
     if not storage_type:
         storage_type = load_storage_config()
     
-    # Default to csv if no config found
+    # Fall back to the default storage if no config found
     if not storage_type:
-        storage_type = 'csv'
+        storage_type = DEFAULT_STORAGE_TYPE
     
-    # Save the current storage configuration
-    save_storage_config(storage_type)
+    # Save the current storage configuration, unless it's only a STORAGE_TYPE
+    # override for this run
+    if args.storage or not storage_type_override():
+        save_storage_config(storage_type)
     
     storage = get_storage(storage_type)
     
@@ -662,7 +1263,12 @@ def main():
     # Process directories
     directory_paths = args.directories
     if directory_paths:
-        process_multiple_directories(directory_paths)
+        extensions: Optional[Set[str]] = None
+        if args.extensions:
+            extensions = {ext.lower() if ext.startswith('.') else '.' + ext.lower() for ext in args.extensions}
+        elif args.media_only:
+            extensions = set(MEDIA_EXTENSIONS)
+        process_multiple_directories(directory_paths, extensions=extensions)
     
     # Generate HTML viewer if requested
     if args.generate_html:
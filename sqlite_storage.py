@@ -1,36 +1,50 @@
 import sqlite3
 import os
 import logging
-import sys
-from typing import Dict, List, Tuple, Optional, Union
-from storage_base import StorageInterface
+from itertools import islice
+from typing import Dict, Iterable, List, Tuple, Optional, Union
+from storage_base import StorageInterface, make_exists_checker
 
 # Constants
 DB_PATH: str = r"file_database.db"
+# Number of file records inserted per executemany call
+WRITE_BATCH_SIZE: int = 1000
+# Bytes of the database file memory-mapped by each connection
+MMAP_SIZE: int = 256 * 1024 * 1024
+# Page cache of the connection that saves scan results, in KiB
+WRITE_CACHE_KIB: int = 64 * 1024
 
-# Configure logging to output to a file in the current directory
-# This sets up logging to both a file and console output
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('file_processing.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)  # Also print to console
-    ]
-)
+def _connect() -> sqlite3.Connection:
+    """Open a connection to DB_PATH
+    
+    The database is kept in WAL mode (see init_database), where synchronous=NORMAL
+    is still crash-safe and only syncs at checkpoints instead of every commit.
+    Reads go through a memory map of the file rather than read() calls.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    return conn
 
 class SQLiteStorage(StorageInterface):
     """SQLite-based storage implementation"""
     
+    # Duplicate groups come from a GROUP BY over the indexed sha256 column
+    queries_duplicates: bool = True
+    
     def __init__(self):
         self.init_database()
     
     def init_database(self) -> None:
         """Initialize the SQLite database with required tables"""
         logging.info("Initializing SQLite database")
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
+        # Write-ahead logging lets the web app read while a scan is writing, and
+        # turns each commit into a sequential append. The mode persists in the file.
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Create files table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS files (
@@ -39,10 +53,21 @@ class SQLiteStorage(StorageInterface):
                 filepath TEXT UNIQUE NOT NULL,
                 creation_time TEXT NOT NULL,
                 file_size INTEGER NOT NULL,
-                sha256 TEXT NOT NULL
+                sha256 TEXT NOT NULL,
+                file_id TEXT NOT NULL DEFAULT '',
+                quick_signature TEXT NOT NULL DEFAULT ''
             )
         ''')
 
+        # Databases created by earlier versions lack the newer columns
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(files)')}
+        for column in ('file_id', 'quick_signature'):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE files ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+
+        # Index hashes so duplicate grouping and pagination don't scan the table
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files(sha256)')
+
         # Add to init_database method
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS file_metadata (
@@ -61,27 +86,22 @@ class SQLiteStorage(StorageInterface):
         logging.info(f"Database initialized at {DB_PATH}")
 
     
-    def load_existing_file_cache(self) -> Dict[Tuple[str, int], Dict[str, Union[str, int]]]:
-        """Load existing file information from database to avoid reprocessing"""
-        file_cache: Dict[Tuple[str, int], Dict[str, Union[str, int]]] = {}
+    def load_existing_file_cache(self) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        """Load the sha256 and quick signature of previously processed files from database to avoid reprocessing"""
+        file_cache: Dict[Tuple[str, int], Tuple[str, str]] = {}
         
         try:
-            conn = sqlite3.connect(DB_PATH)
+            conn = _connect()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT filename, filepath, creation_time, file_size, sha256 FROM files')
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                filename, filepath, creation_time, file_size, sha256 = row
-                cache_key: Tuple[str, int] = (filepath, file_size)
-                file_cache[cache_key] = {
-                    'filename': filename,
-                    'filepath': filepath,
-                    'creation_time': creation_time,
-                    'file_size': file_size,
-                    'sha256': sha256
-                }
+            # Files that were neither hashed nor signed have nothing worth caching.
+            # Rows saved before file_id was recorded are keyed by filepath instead.
+            cursor.execute('''
+                SELECT COALESCE(NULLIF(file_id, ''), filepath), file_size, sha256, quick_signature
+                FROM files WHERE sha256 != '' OR quick_signature != ''
+            ''')
+            for key, file_size, sha256, quick_signature in cursor:
+                file_cache[(key, file_size)] = (sha256, quick_signature)
             
             conn.close()
             logging.info(f"Loaded {len(file_cache)} existing file records from database")
@@ -91,34 +111,54 @@ class SQLiteStorage(StorageInterface):
         
         return file_cache
     
-    def save_files(self, file_data_list: List[Optional[Dict[str, Union[str, int]]]]) -> None:
-        """Save all file information to database"""
-        logging.info(f"Saving {len([f for f in file_data_list if f])} file records to database")
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+    def save_files(self, file_data_list: Iterable[Optional[Dict[str, Union[str, int]]]]) -> None:
+        """Save all file information to database, inserting records as file_data_list is produced
         
-        # Clear existing data
-        cursor.execute('DELETE FROM files')
-        logging.debug("Cleared existing files from database")
-        
-        # Insert new data
-        inserted_count = 0
-        for file_data in file_data_list:
-            if file_data:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO files (filename, filepath, creation_time, file_size, sha256)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
+        Each batch is committed as soon as it's written, so an interrupted scan keeps
+        the files it already processed (and the rows of the previous scan) as cache
+        for the next run. Rows for files missing from this scan are only removed
+        once every record has been saved.
+        """
+        logging.info("Saving file records to database")
+        conn = _connect()
+        try:
+            cursor = conn.cursor()
+            
+            # A larger page cache keeps the files table and sha256 index pages
+            # in memory while a whole scan is written (negative means KiB)
+            cursor.execute(f'PRAGMA cache_size=-{WRITE_CACHE_KIB}')
+            
+            # Track which files this scan saved, so the rest can be removed at the end
+            cursor.execute('CREATE TEMP TABLE saved_paths (filepath TEXT PRIMARY KEY)')
+            
+            # Insert new data in batches, one executemany call and transaction per batch
+            inserted_count = 0
+            file_data_iter = filter(None, file_data_list)
+            while batch := list(islice(file_data_iter, WRITE_BATCH_SIZE)):
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO files (filename, filepath, creation_time, file_size, sha256, file_id,
+                                                  quick_signature)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [(
                     file_data['filename'],
                     file_data['filepath'],
                     file_data['creation_time'],
                     file_data['file_size'],
-                    file_data['sha256']
-                ))
-                inserted_count += 1
-        
-        conn.commit()
-        conn.close()
+                    file_data['sha256'],
+                    file_data.get('file_id', ''),
+                    file_data.get('quick_signature', '')
+                ) for file_data in batch])
+                cursor.executemany('INSERT OR IGNORE INTO saved_paths (filepath) VALUES (?)',
+                                   [(file_data['filepath'],) for file_data in batch])
+                conn.commit()
+                inserted_count += len(batch)
+            
+            # Clear files that weren't part of this scan
+            cursor.execute('DELETE FROM files WHERE filepath NOT IN (SELECT filepath FROM saved_paths)')
+            logging.debug(f"Removed {cursor.rowcount} files not found by this scan")
+            conn.commit()
+        finally:
+            conn.close()
         logging.info(f"Saved {inserted_count} file records to database")
 
     
@@ -131,7 +171,7 @@ class SQLiteStorage(StorageInterface):
     def refresh_duplicates(self) -> None:
         """Refresh duplicates by removing entries for files that no longer exist"""
         logging.info("Refreshing files database - removing entries for non-existent files")
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         # Get all files
@@ -139,40 +179,50 @@ class SQLiteStorage(StorageInterface):
         files = cursor.fetchall()
         
         # Check which files still exist
-        deleted_count = 0
-        for filepath, sha256 in files:
-            if not os.path.exists(filepath):
-                cursor.execute('DELETE FROM files WHERE filepath = ?', (filepath,))
-                logging.debug(f"Removed non-existent file from database: {filepath}")
-                deleted_count += 1
+        exists = make_exists_checker()
+        exists.prefetch(filepath for filepath, _ in files)
+        missing_files = [(filepath,) for filepath, sha256 in files if not exists(filepath)]
+        
+        # Delete all missing files in a single transaction
+        cursor.executemany('DELETE FROM files WHERE filepath = ?', missing_files)
+        deleted_count = len(missing_files)
         
         conn.commit()
         conn.close()
         logging.info(f"Refreshed files database. Removed {deleted_count} non-existent files")
 
-    def get_duplicate_groups(self, limit: Optional[int] = None) -> List[List[Dict[str, Union[str, int]]]]:
+    def get_duplicate_groups(self, limit: Optional[int] = None, offset: int = 0,
+                             after: Optional[str] = None) -> List[List[Dict[str, Union[str, int]]]]:
         """Get duplicate file groups from database for HTML viewer
         
         Args:
             limit (Optional[int]): Maximum number of duplicate groups to return. 
                                 If None, returns all groups.
+            offset (int): Number of groups to skip before collecting results.
+            after (Optional[str]): Only return groups whose sha256 sorts after this cursor.
         """
         logging.info("Retrieving duplicate groups from database")
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
-        # Query files that have duplicate SHA256 hashes
+        # Query files that have duplicate SHA256 hashes, paginating over groups
+        # rather than rows (a LIMIT of -1 means no limit in SQLite). The cursor
+        # is a range condition on the sha256 index, so deep pages skip nothing,
+        # and it always excludes the empty sha256 of files that were never hashed.
         cursor.execute('''
             SELECT f1.sha256, f1.filename, f1.filepath, f1.creation_time, f1.file_size
             FROM files f1
             WHERE f1.sha256 IN (
                 SELECT f2.sha256 
                 FROM files f2 
+                WHERE f2.sha256 > ?
                 GROUP BY f2.sha256 
                 HAVING COUNT(*) > 1
+                ORDER BY f2.sha256
+                LIMIT ? OFFSET ?
             )
             ORDER BY f1.sha256
-        ''')
+        ''', (after or '', limit if limit is not None else -1, offset))
         rows = cursor.fetchall()
         
         groups = []
@@ -203,11 +253,36 @@ class SQLiteStorage(StorageInterface):
         
         conn.close()
         
-        # Apply limit if specified
         if limit is not None:
-            groups = groups[:limit]
             logging.info(f"Retrieved {len(groups)} duplicate groups from database (limited to {limit})")
         else:
             logging.info(f"Retrieved {len(groups)} duplicate groups from database")
         
-        return groups
\ No newline at end of file
+        return groups
+
+    def count_duplicate_groups(self) -> int:
+        """Count duplicate file groups in database"""
+        conn = _connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM (
+                SELECT sha256 FROM files WHERE sha256 != '' GROUP BY sha256 HAVING COUNT(*) > 1
+            )
+        ''')
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+    def get_last_modified_ns(self) -> Optional[int]:
+        """Get the modification time of the database
+        
+        In WAL mode, commits land in the -wal file until they are checkpointed
+        into the database file, so the newer of the two is returned.
+        """
+        mtimes = []
+        for path in (DB_PATH, DB_PATH + '-wal'):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                continue
+        return max(mtimes) if mtimes else None
@@ -1,17 +1,74 @@
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, List, Tuple, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Set, Tuple, Optional, Union
+
+# Bound once so the per-file existence check skips the os.path attribute lookups
+_split_path = os.path.split
+
+# Number of threads used to list directories when prefetching existence checks
+EXISTS_CHECK_WORKERS: int = 32
+
+def _list_directory(directory: str) -> Set[str]:
+    """List a directory's entries, treating unreadable or missing directories as empty"""
+    try:
+        return set(os.listdir(directory or '.'))
+    except OSError:
+        return set()
+
+class ExistsChecker:
+    """File existence check that lists each parent directory only once
+    
+    Paths are bucketed by directory and answered from a set of directory entries,
+    so checking N files spread over D directories costs D listdir calls instead of N stats.
+    Directory listings can be prefetched concurrently with prefetch().
+    """
+    
+    def __init__(self):
+        self.dir_contents: Dict[str, Set[str]] = {}
+    
+    def __call__(self, filepath: str) -> bool:
+        directory, name = _split_path(filepath)
+        present = self.dir_contents.get(directory)
+        if present is None:
+            present = self.dir_contents[directory] = _list_directory(directory)
+        return name in present
+    
+    def prefetch(self, filepaths: Iterable[str]) -> None:
+        """List the not yet seen parent directories of the given files in parallel
+        
+        Listing is syscall-bound and releases the GIL, so a thread pool hides
+        per-directory latency on large or networked trees.
+        """
+        directories = list({os.path.dirname(filepath) for filepath in filepaths} - self.dir_contents.keys())
+        if len(directories) <= 1:
+            return
+        with ThreadPoolExecutor(max_workers=min(EXISTS_CHECK_WORKERS, len(directories))) as executor:
+            self.dir_contents.update(zip(directories, executor.map(_list_directory, directories)))
+
+def make_exists_checker() -> ExistsChecker:
+    """Build a file existence check that lists each parent directory only once"""
+    return ExistsChecker()
 
 class StorageInterface(ABC):
     """Abstract base class for storage interfaces"""
     
+    # True if duplicates are grouped from the saved files when queried, so scans
+    # don't need to collect them for save_duplicates
+    queries_duplicates: bool = False
+    
     @abstractmethod
-    def load_existing_file_cache(self) -> Dict[Tuple[str, int], Dict[str, Union[str, int]]]:
-        """Load existing file information to avoid reprocessing"""
+    def load_existing_file_cache(self) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        """Load the (sha256, quick_signature) of previously processed files, keyed by
+        (file_id, file_size), to avoid reprocessing
+        
+        Files stored before file_id was recorded are keyed by (filepath, file_size).
+        """
         pass
     
     @abstractmethod
-    def save_files(self, file_data_list: List[Optional[Dict[str, Union[str, int]]]]) -> None:
-        """Save all file information"""
+    def save_files(self, file_data_list: Iterable[Optional[Dict[str, Union[str, int]]]]) -> None:
+        """Save all file information, consuming file_data_list as it's produced"""
         pass
     
     @abstractmethod
@@ -25,11 +82,31 @@ class StorageInterface(ABC):
         pass
 
     @abstractmethod
-    def get_duplicate_groups(self, limit: Optional[int] = None) -> List[List[Dict[str, Union[str, int]]]]:
+    def get_duplicate_groups(self, limit: Optional[int] = None, offset: int = 0,
+                             after: Optional[str] = None) -> List[List[Dict[str, Union[str, int]]]]:
         """Get duplicate file groups for HTML viewer
         
+        Groups are ordered by sha256 and each file entry's file_size is returned as an int.
+        
         Args:
             limit (Optional[int]): Maximum number of duplicate groups to return. 
                                   If None, returns all groups.
+            offset (int): Number of groups to skip before collecting results.
+            after (Optional[str]): Only return groups whose sha256 sorts after this cursor,
+                                   so deep pages don't have to skip earlier groups.
+        """
+        pass
+
+    @abstractmethod
+    def count_duplicate_groups(self) -> int:
+        """Get the total number of duplicate file groups"""
+        pass
+
+    @abstractmethod
+    def get_last_modified_ns(self) -> Optional[int]:
+        """Get when duplicate data was last written, in nanoseconds since the epoch
+        
+        Returns None if nothing has been stored yet. Callers use this to tell
+        whether previously served duplicate groups are still current.
         """
         pass
\ No newline at end of file
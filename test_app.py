@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from email.utils import formatdate
+
+try:
+    import flask  # noqa: F401
+except ImportError:
+    flask = None
+
+from csv_storage import CSVStorage
+
+
+@unittest.skipUnless(flask, "Flask is not installed")
+class ConditionalDuplicatesTest(unittest.TestCase):
+    """Revalidating /duplicates with If-None-Match and If-Modified-Since"""
+
+    def setUp(self):
+        import app as app_module
+        self.app_module = app_module
+        self.old_cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+
+        self.old_storage = app_module.storage
+        app_module.storage = CSVStorage()
+        app_module.storage.save_duplicates({
+            'a' * 64: [{'filename': name, 'filepath': os.path.join(self.tmpdir.name, name),
+                        'creation_time': '2024-01-01 00:00:00', 'file_size': 1}
+                       for name in ('one.jpg', 'two.jpg')]
+        })
+        self.client = app_module.app.test_client()
+        self.first = self.client.get('/duplicates')
+        self.etag = self.first.headers['ETag']
+
+    def tearDown(self):
+        self.app_module.storage = self.old_storage
+        os.chdir(self.old_cwd)
+        self.tmpdir.cleanup()
+
+    def get(self, **headers):
+        return self.client.get('/duplicates', headers=headers)
+
+    def test_matching_etag(self):
+        self.assertEqual(self.first.status_code, 200)
+        self.assertEqual(self.get(**{'If-None-Match': self.etag}).status_code, 304)
+
+    def test_etag_in_list(self):
+        response = self.get(**{'If-None-Match': f'W/"other", {self.etag}'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], self.etag)
+
+    def test_star_etag(self):
+        self.assertEqual(self.get(**{'If-None-Match': '*'}).status_code, 304)
+
+    def test_stale_etag(self):
+        self.assertEqual(self.get(**{'If-None-Match': 'W/"other"'}).status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.first.headers['Last-Modified']
+        self.assertEqual(self.get(**{'If-Modified-Since': last_modified}).status_code, 304)
+
+        last_modified_ns = self.app_module.storage.get_last_modified_ns()
+        earlier = formatdate(last_modified_ns / 1e9 - 60, usegmt=True)
+        self.assertEqual(self.get(**{'If-Modified-Since': earlier}).status_code, 200)
+
+    def test_etag_takes_precedence(self):
+        response = self.get(**{'If-None-Match': 'W/"other"',
+                               'If-Modified-Since': self.first.headers['Last-Modified']})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
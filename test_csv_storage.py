@@ -0,0 +1,84 @@
+import csv
+import os
+import tempfile
+import unittest
+from array import array
+
+import csv_storage
+from csv_storage import CSVStorage, DUPLICATE_COLUMNS, DUPLICATES_CSV, DUPLICATES_INDEX
+
+
+class LegacyDuplicatesTest(unittest.TestCase):
+    """Paging through duplicates CSVs written before groups were sorted by sha256"""
+
+    # Groups in the order an older version wrote them, not in sha256 order
+    SHA256S = ['c' * 64, 'a' * 64, 'e' * 64, 'b' * 64, 'd' * 64]
+
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        csv_storage._invalidate_group_cache()
+
+        with open(DUPLICATES_CSV, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(DUPLICATE_COLUMNS)
+            for sha256 in self.SHA256S:
+                for name in ('one', 'two'):
+                    path = os.path.join(self.tmpdir.name, f"{sha256[0]}-{name}.jpg")
+                    open(path, 'w').close()
+                    writer.writerow([sha256, os.path.basename(path), path, '2024-01-01 00:00:00', 0, 2])
+        self.storage = CSVStorage()
+
+    def tearDown(self):
+        csv_storage._invalidate_group_cache()
+        os.chdir(self.old_cwd)
+        self.tmpdir.cleanup()
+
+    def page_through(self, limit=2):
+        """Follow next cursors the way the viewer does, returning every sha256 seen"""
+        seen = []
+        after = ''
+        for _ in range(len(self.SHA256S) + 1):
+            groups = self.storage.get_duplicate_groups(limit=limit, after=after)
+            if not groups:
+                break
+            self.assertTrue(all(len(group) == 2 for group in groups))
+            seen.extend(group[0]['sha256'] for group in groups)
+            after = groups[-1][0]['sha256']
+        return seen
+
+    def test_cursor_pages_unsorted_csv(self):
+        self.assertEqual(self.page_through(), sorted(self.SHA256S))
+
+    def test_offset_pages_match_cursor_order(self):
+        pages = [self.storage.get_duplicate_groups(limit=2, offset=offset) for offset in (0, 2, 4)]
+        self.assertEqual([group[0]['sha256'] for page in pages for group in page], sorted(self.SHA256S))
+
+    def test_legacy_index_is_ignored(self):
+        # Older indexes hold the CSV size followed by the group offsets
+        index = array('Q', [os.path.getsize(DUPLICATES_CSV)])
+        with open(DUPLICATES_CSV, 'rb') as csvfile:
+            position = len(csvfile.readline())
+            for line_number, line in enumerate(csvfile):
+                if line_number % 2 == 0:
+                    index.append(position)
+                position += len(line)
+        with open(DUPLICATES_INDEX, 'wb') as indexfile:
+            index.tofile(indexfile)
+
+        self.assertEqual(self.page_through(), sorted(self.SHA256S))
+        self.assertEqual(self.storage.count_duplicate_groups(), len(self.SHA256S))
+
+    def test_refresh_sorts_and_indexes(self):
+        self.storage.refresh_duplicates()
+
+        with open(DUPLICATES_CSV, newline='', encoding='utf-8') as csvfile:
+            rows = list(csv.DictReader(csvfile))
+        self.assertEqual([row['sha256'] for row in rows[::2]], sorted(self.SHA256S))
+        self.assertIsNotNone(csv_storage._load_duplicate_index())
+        self.assertEqual(self.page_through(), sorted(self.SHA256S))
+
+
+if __name__ == '__main__':
+    unittest.main()